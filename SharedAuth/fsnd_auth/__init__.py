@@ -0,0 +1,11 @@
+from .auth import Auth, AuthError
+from .keys import InMemoryKeyProvider, JWKSError, JWKSKeyStore, PEMKeyProvider
+from .timing import StageTimings
+from .token_cache import VerifiedPayload, VerifiedTokenCache, verified_tokens
+
+__all__ = [
+    'Auth', 'AuthError',
+    'InMemoryKeyProvider', 'JWKSError', 'JWKSKeyStore', 'PEMKeyProvider',
+    'StageTimings',
+    'VerifiedPayload', 'VerifiedTokenCache', 'verified_tokens',
+]
@@ -0,0 +1,251 @@
+import itertools
+import threading
+import weakref
+from functools import wraps
+
+from flask import request
+from jose import jwt
+
+from .keys import JWKSError, JWKSKeyStore
+from .timing import StageTimings
+from .token_cache import VerifiedPayload, verified_tokens as shared_verified_tokens
+
+_provider_ids = itertools.count(1)
+_provider_scopes = weakref.WeakKeyDictionary()
+# Providers that can't be weakly referenced or hashed (e.g. __slots__ without __weakref__),
+# by id() and kept alive so their id can't be reused.
+_pinned_provider_scopes = {}
+_provider_scopes_lock = threading.Lock()
+
+
+def provider_scope(key_provider):
+    """A number unique to this key provider object, for scoping cached tokens.
+
+    Kept in a table next to the provider rather than using id(), which a new
+    provider can reuse once an old one is garbage collected, and without
+    touching the provider itself, which may be frozen or use __slots__.
+    """
+    with _provider_scopes_lock:
+        try:
+            scope_id = _provider_scopes.get(key_provider)
+            if scope_id is None:
+                scope_id = _provider_scopes[key_provider] = next(_provider_ids)
+        except TypeError:
+            pinned = _pinned_provider_scopes.get(id(key_provider))
+            if pinned is None:
+                pinned = _pinned_provider_scopes[id(key_provider)] = (key_provider, next(_provider_ids))
+            scope_id = pinned[1]
+    return scope_id
+
+
+class AuthError(Exception):
+    """A standardized way to communicate auth failure modes.
+
+    error is a dict with a code and a description; status_code is the HTTP
+    status the app should answer with.
+    """
+
+    def __init__(self, error, status_code):
+        self.error = error
+        self.status_code = status_code
+
+
+class Auth:
+    """Bearer token authentication for one API.
+
+    Tokens must be signed with a key from key_provider (see keys.py), issued
+    by issuer and intended for audience. Verified payloads are kept in
+    verified_tokens, shared by every Auth in the process unless one is
+    given, and the time spent in each stage of requires_auth is recorded in
+    timings.
+    """
+
+    def __init__(self, issuer, audience, key_provider, algorithms=('RS256',),
+                 verified_tokens=None, timings=None):
+        self.issuer = issuer
+        self.audience = audience
+        self.key_provider = key_provider
+        self.algorithms = list(algorithms)
+        self.verified_tokens = verified_tokens if verified_tokens is not None else shared_verified_tokens
+        self.timings = timings if timings is not None else StageTimings()
+
+    @classmethod
+    def auth0(cls, domain, audience, jwks_url=None, **kwargs):
+        """An Auth for tokens from an Auth0 tenant, keys from its (shared) JWKS endpoint.
+
+        jwks_url overrides the tenant's endpoint, e.g. with a file:// URL to
+        test without Auth0.
+        """
+        jwks = JWKSKeyStore.shared(jwks_url or f'https://{domain}/.well-known/jwks.json')
+        return cls('https://' + domain + '/', audience, jwks, **kwargs)
+
+    @property
+    def cache_scope(self):
+        # A token is only trusted again by an Auth checking the same claims against the same keys.
+        return f'{provider_scope(self.key_provider)} {self.issuer} {self.audience} {",".join(self.algorithms)}'
+
+    def get_token_auth_header(self):
+        """Obtains the Access Token from the Authorization Header
+        """
+        auth = request.headers.get('Authorization', None)
+        if not auth:
+            raise AuthError({
+                'code': 'authorization_header_missing',
+                'description': 'Authorization header is expected.'
+            }, 401)
+
+        parts = auth.split()
+        if parts[0].lower() != 'bearer':
+            raise AuthError({
+                'code': 'invalid_header',
+                'description': 'Authorization header must start with "Bearer".'
+            }, 401)
+
+        elif len(parts) == 1:
+            raise AuthError({
+                'code': 'invalid_header',
+                'description': 'Token not found.'
+            }, 401)
+
+        elif len(parts) > 2:
+            raise AuthError({
+                'code': 'invalid_header',
+                'description': 'Authorization header must be bearer token.'
+            }, 401)
+
+        return parts[1]
+
+    def check_permissions(self, permission, payload, require='all'):
+        """Checks the payload's permissions claim.
+
+        permission is a single permission, any iterable of them, or None/''
+        for none; require is 'all' if every one is needed or 'any' if one is
+        enough. Raises an
+        AuthError if the claim is missing or the permissions aren't held.
+        """
+        if 'permissions' not in payload:
+            raise AuthError({
+                'code': 'invalid_claims',
+                'description': 'Permissions not included in JWT.'
+            }, 400)
+
+        if not permission:
+            required = frozenset()
+        elif isinstance(permission, str):
+            required = frozenset([permission])
+        else:
+            required = frozenset(permission)
+        # Verified payloads carry their permissions as a set already; anything else is converted here.
+        granted = getattr(payload, 'permission_set', None)
+        if granted is None:
+            granted = frozenset(payload['permissions'])
+
+        if require == 'any':
+            allowed = not required or not required.isdisjoint(granted)
+        else:
+            allowed = required <= granted
+        if not allowed:
+            raise AuthError({
+                'code': 'unauthorized',
+                'description': 'Permission not found.'
+            }, 403)
+        return True
+
+    def verify_decode_jwt(self, token):
+        """Verifies the token and returns its payload.
+
+        Tokens verified before are answered from verified_tokens until they
+        expire. The cache lookup, key lookup and signature check are each
+        timed into timings.
+        """
+        scope = self.cache_scope
+        with self.timings.stage('cache'):
+            payload = self.verified_tokens.get(token, scope)
+        if payload is not None:
+            return payload
+
+        with self.timings.stage('jwks'):
+            try:
+                unverified_header = jwt.get_unverified_header(token)
+            except jwt.JWTError:
+                raise AuthError({
+                    'code': 'invalid_header',
+                    'description': 'Unable to parse authentication token.'
+                }, 401)
+            if 'kid' not in unverified_header and self.key_provider.requires_kid:
+                raise AuthError({
+                    'code': 'invalid_header',
+                    'description': 'Authorization malformed.'
+                }, 401)
+
+            try:
+                key = self.key_provider.get_key(unverified_header.get('kid'))
+            except JWKSError:
+                raise AuthError({
+                    'code': 'jwks_unavailable',
+                    'description': 'Unable to fetch the signing keys.'
+                }, 503)
+            if not key:
+                raise AuthError({
+                    'code': 'invalid_header',
+                    'description': 'Unable to find the appropriate key.'
+                }, 400)
+
+        with self.timings.stage('verify'):
+            try:
+                payload = VerifiedPayload(jwt.decode(
+                    token,
+                    key,
+                    algorithms=self.algorithms,
+                    audience=self.audience,
+                    issuer=self.issuer
+                ))
+            except jwt.ExpiredSignatureError:
+                raise AuthError({
+                    'code': 'token_expired',
+                    'description': 'Token expired.'
+                }, 401)
+            except jwt.JWTClaimsError:
+                raise AuthError({
+                    'code': 'invalid_claims',
+                    'description': 'Incorrect claims. Please, check the audience and issuer.'
+                }, 401)
+            except Exception:
+                raise AuthError({
+                    'code': 'invalid_header',
+                    'description': 'Unable to parse authentication token.'
+                }, 400)
+
+        self.verified_tokens.put(token, payload, scope)
+        return payload
+
+    def requires_auth(self, *permissions, require='all'):
+        """Decorator passing the verified payload to the view as its first argument.
+
+            @auth.requires_auth
+            @auth.requires_auth('post:drinks')
+            @auth.requires_auth('patch:drinks', 'delete:drinks', require='any')
+
+        Without permissions any valid token is accepted and the permissions
+        claim isn't needed.
+        """
+        if len(permissions) == 1 and callable(permissions[0]):
+            return self.requires_auth()(permissions[0])
+        if require not in ('all', 'any'):
+            raise ValueError(f"require must be 'all' or 'any', not {require!r}")
+        # Built once per route rather than on every request.
+        required = frozenset(permission for permission in permissions if permission)
+
+        def requires_auth_decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.timings.stage('header'):
+                    token = self.get_token_auth_header()
+                payload = self.verify_decode_jwt(token)
+                if required:
+                    with self.timings.stage('permissions'):
+                        self.check_permissions(required, payload, require)
+                return f(payload, *args, **kwargs)
+
+            return wrapper
+        return requires_auth_decorator
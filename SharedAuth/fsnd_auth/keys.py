@@ -0,0 +1,207 @@
+"""Key providers: where requires_auth gets the key that signed a token.
+
+A key provider is any object with
+
+    requires_kid: whether tokens must name their key in the kid header
+    get_key(kid): the key for kid (a JWK dict or a PEM string, anything
+        jose.jwt.decode accepts), None if it has no such key, or raises
+        JWKSError if the keys can't be loaded at all.
+
+Auth numbers each provider it uses (see auth.provider_scope), so tokens
+verified against one provider's keys are never trusted by another.
+
+JWKSKeyStore fetches the keys from a JWKS endpoint such as Auth0's,
+PEMKeyProvider serves one local public key and InMemoryKeyProvider serves
+keys handed to it directly, e.g. in tests.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSError(Exception):
+    pass
+
+
+class JWKSKeyStore:
+    """Signing keys from a JWKS endpoint, cached by kid.
+
+    Use JWKSKeyStore.shared(url) so every app in the process that trusts the
+    same endpoint shares one cached key set and one refresh thread.
+
+    The key set is fetched on first use and then refreshed by a background
+    thread shortly before it expires, so requests never wait on the network
+    once the store is warm. A token signed with a kid the store doesn't know
+    (e.g. right after a key rotation) triggers one immediate refetch, at most
+    once every min_refetch_interval seconds, so bad tokens can't be used to
+    hammer the endpoint.
+
+    url can be anything urlopen reads, so tests can point it at a
+    file:///path/to/jwks.json or a local stub server instead of Auth0.
+    """
+
+    requires_kid = True
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url, **kwargs):
+        """The process-wide store for url, created with kwargs on first use.
+
+        Raises ValueError if a later call asks for settings the existing
+        store wasn't created with, rather than quietly ignoring them.
+        """
+        with cls._shared_lock:
+            store = cls._shared.get(url)
+            if store is None:
+                store = cls._shared[url] = cls(url, **kwargs)
+                return store
+        differing = sorted(name for name, value in kwargs.items() if getattr(store, name, None) != value)
+        if differing:
+            settings = ', '.join(f'{name}={getattr(store, name, None)!r}' for name in differing)
+            raise ValueError(f'The shared JWKSKeyStore for {url} already exists with {settings}.')
+        return store
+
+    def __init__(self, url, max_age=3600, refresh_before=300, min_refetch_interval=30,
+                 timeout=5, background=True):
+        self.url = url
+        # Used when the response has no Cache-Control max-age of its own.
+        self.max_age = max_age
+        self.refresh_before = refresh_before
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.background = background
+
+        self.keys = {}
+        self.expires = 0
+        self.last_fetch = None
+        self.fetches = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def fetch(self):
+        """Downloads the key set, returning ({kid: key}, seconds it may be cached)."""
+        with urlopen(self.url, timeout=self.timeout) as response:
+            jwks = json.loads(response.read())
+            cache_control = response.headers.get('Cache-Control', '') if response.headers else ''
+        match = re.search(r'max-age=(\d+)', cache_control or '')
+        max_age = int(match.group(1)) if match else self.max_age
+
+        keys = {}
+        for key in jwks.get('keys', []):
+            # Only RSA signing keys can verify RS256 tokens; other keys in the set are ignored
+            # rather than failing the fetch.
+            if 'kid' not in key or key.get('kty') != 'RSA' or 'n' not in key or 'e' not in key:
+                continue
+            keys[key['kid']] = {
+                'kty': key['kty'],
+                'kid': key['kid'],
+                'use': key.get('use'),
+                'n': key['n'],
+                'e': key['e']
+            }
+        return keys, max_age
+
+    def refresh(self, min_interval=0):
+        """Fetches the key set now, keeping the old keys if that fails.
+
+        Skipped when another fetch finished within min_interval seconds, so
+        requests that were all waiting on the same refetch only make one.
+        """
+        with self.lock:
+            if self.last_fetch is not None and time.monotonic() - self.last_fetch < min_interval:
+                return False
+            self.last_fetch = time.monotonic()
+            self.fetches += 1
+            try:
+                keys, max_age = self.fetch()
+            except Exception as e:
+                if not self.keys:
+                    raise JWKSError(f'Unable to fetch {self.url}: {e}')
+                logger.warning('Keeping cached keys, unable to refresh %s: %s', self.url, e)
+                return False
+            self.keys = keys
+            self.expires = self.last_fetch + max_age
+            return True
+
+    def get_key(self, kid):
+        """The key with this kid, or None if the endpoint doesn't have it."""
+        if time.monotonic() >= self.expires:
+            # Only reached when the background refresh isn't keeping up, e.g. the endpoint is down.
+            self.refresh(min_interval=self.min_refetch_interval)
+            self.start()
+        if not self.keys:
+            raise JWKSError(f'No keys fetched from {self.url} yet.')
+
+        key = self.keys.get(kid)
+        if key is None:
+            self.refresh(min_interval=self.min_refetch_interval)
+            key = self.keys.get(kid)
+        return key
+
+    def start(self):
+        if not self.background or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run, name='jwks-refresh', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while True:
+            delay = max(self.expires - self.refresh_before - time.monotonic(), self.min_refetch_interval)
+            if self.stopped.wait(delay):
+                return
+            try:
+                self.refresh()
+            except JWKSError as e:
+                logger.warning('%s', e)
+
+
+class PEMKeyProvider:
+    """A single public key in PEM format, given as a string or read from path.
+
+    With a kid, only tokens naming that kid are verified with it; without
+    one, every token is, and tokens need no kid header.
+    """
+
+    def __init__(self, pem=None, path=None, kid=None):
+        if (pem is None) == (path is None):
+            raise ValueError('Pass exactly one of pem or path.')
+        if path is not None:
+            with open(path) as f:
+                pem = f.read()
+        self.pem = pem
+        self.kid = kid
+        self.requires_kid = kid is not None
+
+    def get_key(self, kid):
+        if self.kid is None or kid == self.kid:
+            return self.pem
+        return None
+
+
+class InMemoryKeyProvider:
+    """Keys by kid, as JWK dicts or PEM strings, managed by the caller."""
+
+    requires_kid = True
+
+    def __init__(self, keys=None):
+        self.keys = dict(keys or {})
+
+    def add(self, kid, key):
+        self.keys[kid] = key
+
+    def remove(self, kid):
+        self.keys.pop(kid, None)
+
+    def get_key(self, kid):
+        return self.keys.get(kid)
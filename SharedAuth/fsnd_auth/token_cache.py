@@ -0,0 +1,96 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedPayload(dict):
+    """The claims of a verified token.
+
+    Behaves as the plain claims dict and also carries the permissions claim
+    as a frozenset, built once when the token is verified and kept with it
+    in the cache, so permission checks are set lookups however long the
+    list is.
+    """
+
+    __slots__ = ('permission_set',)
+
+    def __init__(self, claims):
+        super().__init__(claims)
+        self.permission_set = frozenset(claims.get('permissions') or ())
+
+    def copy(self):
+        """A deep copy, so nested claims like the permissions list aren't shared either."""
+        payload = VerifiedPayload.__new__(VerifiedPayload)
+        dict.update(payload, copy.deepcopy(dict(self)))
+        payload.permission_set = self.permission_set
+        return payload
+
+
+class VerifiedTokenCache:
+    """Payloads of tokens that already passed verification, keyed by token hash.
+
+    A client usually sends the same bearer token for many requests; a hit
+    skips parsing and RSA verification. Entries never outlive the token's exp
+    claim, so an expired token is rejected exactly as if it had never been
+    cached, and max_age bounds how long a token stays trusted after its
+    signing key is rotated away. Tokens without an exp are not cached.
+
+    Every hit gets its own copy of the payload, and put() stores a copy, so
+    a view changing its payload can't change what later requests see.
+
+    One cache can serve several apps: scope (the key provider, issuer and
+    audience a token was verified with) is part of the key, so a token
+    verified by one Auth is never taken as verified by an Auth that trusts
+    other keys or claims.
+    """
+
+    def __init__(self, max_entries=1024, max_age=600):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token, scope=''):
+        # Hashed so the cache never holds usable credentials.
+        return hashlib.sha256(scope.encode('utf-8') + b'\0' + token.encode('utf-8')).digest()
+
+    def get(self, token, scope=''):
+        key = self.key(token, scope)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[0]
+        return payload.copy()
+
+    def put(self, token, payload, scope=''):
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        key = self.key(token, scope)
+        expires = min(exp, time.time() + self.max_age)
+        payload = payload.copy()
+        with self.lock:
+            self.entries[key] = (payload, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Used by every Auth that isn't given a cache of its own.
+verified_tokens = VerifiedTokenCache()
@@ -0,0 +1,13 @@
+from setuptools import setup
+
+setup(
+    name='fsnd-auth',
+    version='0.1.0',
+    description='Auth0 bearer token authentication shared by the FSND Flask apps',
+    packages=['fsnd_auth'],
+    python_requires='>=3.7',
+    install_requires=[
+        'Flask',
+        'python-jose-cryptodome',
+    ],
+)
@@ -3,9 +3,10 @@
 #----------------------------------------------------------------------------#
 
 import json
+from datetime import datetime
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql import func
@@ -25,15 +26,23 @@ app.config.from_object('config')
 db = SQLAlchemy(app)
 
 from models import *
+from cache import response_cache
+from importer import import_command
 
 migrate = Migrate(app, db)
+response_cache.init_app(app)
+app.cli.add_command(import_command)
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
+  # Show.start_time is a timestamp column, so most values arrive as datetimes already.
+  if isinstance(value, datetime):
+    date = value
+  else:
+    date = dateutil.parser.parse(value)
   if format == 'full':
       format="EEEE MMMM, d, y 'at' h:mma"
   elif format == 'medium':
@@ -55,6 +64,7 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@response_cache.cached('venues')
 def venues():
   # num_shows should be aggregated based on number of upcoming shows per venue.
   venues = Venue.get_venue_list()
@@ -101,6 +111,7 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@response_cache.cached('artists')
 def artists():
   data = Artist.get_artists_list()
 
@@ -197,12 +208,18 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@response_cache.cached('shows')
 def shows():
-  # displays list of shows at /shows
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-
-  shows = Show.get_show_list()
-  return render_template('pages/shows.html', shows=shows)
+  # displays list of shows at /shows, one page at a time. Only upcoming shows unless ?view=all.
+  upcoming_only = request.args.get('view') != 'all'
+  after = request.args.get('after')
+  try:
+    after = Show.decode_cursor(after) if after else None
+  except ValueError:
+    abort(400)
+
+  shows, next_cursor = Show.get_show_list(after, upcoming_only)
+  return render_template('pages/shows.html', shows=shows, next_cursor=next_cursor, upcoming_only=upcoming_only)
 
 @app.route('/shows/create')
 def create_shows():
@@ -0,0 +1,44 @@
+import math
+
+from sqlalchemy import event
+
+from models import db
+
+BATCH_SIZE = 10000
+
+
+class QueryCounter(object):
+    """Counts the statements sent to the database while the block is active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def insert_batches(table, rows):
+    # Streams generated rows into the table with one executemany per BATCH_SIZE rows.
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile of an already sorted list.
+    rank = max(int(math.ceil(percent / 100.0 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
@@ -0,0 +1,178 @@
+'''
+Latency, queries and memory per request for the main fyyur pages.
+
+Run from the starter_code directory:
+
+    python -m benchmarks.routes --scale 0.01
+    python -m benchmarks.routes --database-url postgresql://localhost:5432/fyyur_bench --output results.json
+
+At --scale 1 the synthetic dataset is 10k venues, 100k artists and 1M shows.
+Requests go through the Flask test client, so the numbers cover routing,
+queries and template rendering but not a real network stack. The listing page
+cache is turned off unless --cache is given.
+
+Results are written as JSON so runs from different commits can be diffed.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app import app
+from cache import response_cache, NullCache
+from models import db, artist_genre, venue_genre, Artist, Genre, Show, Venue
+from benchmarks.common import QueryCounter, insert_batches, percentile
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+          'Rock n Roll', 'Soul', 'Other']
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Seattle', 'WA'), ('Chicago', 'IL'),
+          ('Nashville', 'TN'), ('Denver', 'CO'), ('Portland', 'OR'), ('Atlanta', 'GA'), ('Boston', 'MA')]
+WORDS = ['Blue', 'Note', 'Cellar', 'Velvet', 'Room', 'Echo', 'Lounge', 'Garage', 'Hall', 'Taproom',
+         'Wild', 'Sax', 'Band', 'Petals', 'Hop', 'Musical', 'Square', 'Live', 'Coffee', 'Pianos']
+SIZES = {'venues': 10000, 'artists': 100000, 'shows': 1000000}
+
+
+def generate(scale, seed):
+    rng = random.Random(seed)
+    sizes = {table: max(int(size * scale), 1) for table, size in SIZES.items()}
+    now = datetime.now()
+
+    insert_batches(Genre.__table__, ({'id': i, 'name': name} for i, name in enumerate(GENRES, 1)))
+    for table, association, column, seeking in ((Venue.__table__, venue_genre, 'venue_id', 'seeking_talent'),
+                                                (Artist.__table__, artist_genre, 'artist_id', 'seeking_venue')):
+        total = sizes[table.name.lower() + 's']
+        rows = []
+        for i in range(1, total + 1):
+            city, state = rng.choice(CITIES)
+            row = {'id': i, 'name': ' '.join(rng.sample(WORDS, 3)) + f' {i}', 'city': city, 'state': state,
+                   'phone': '123-123-1234', 'image_link': f'https://example.com/{i}.jpg', seeking: rng.random() < 0.3}
+            if table is Venue.__table__:
+                row['address'] = f'{i} Folsom Street'
+            rows.append(row)
+        insert_batches(table, rows)
+        insert_batches(association, ({'genre_id': genre_id, column: i}
+                                     for i in range(1, total + 1)
+                                     for genre_id in rng.sample(range(1, len(GENRES) + 1), 2)))
+
+    insert_batches(Show.__table__, ({'artist_id': rng.randint(1, sizes['artists']),
+                                     'venue_id': rng.randint(1, sizes['venues']),
+                                     'start_time': now + timedelta(minutes=rng.randint(-1051200, 1051200))}
+                                    for _ in range(sizes['shows'])))
+    return sizes
+
+
+def route_requests(sizes, seed):
+    rng = random.Random(seed)
+    return {
+        'venues': lambda client: client.get('/venues'),
+        'venue_detail': lambda client: client.get(f'/venues/{rng.randint(1, sizes["venues"])}'),
+        'artist_detail': lambda client: client.get(f'/artists/{rng.randint(1, sizes["artists"])}'),
+        'artists_search': lambda client: client.post('/artists/search', data={'search_term': rng.choice(WORDS)}),
+        'venues_search': lambda client: client.post('/venues/search', data={'search_term': rng.choice(WORDS)}),
+        'shows': lambda client: client.get('/shows'),
+    }
+
+
+def measure(request, client, repeat, warmup):
+    for _ in range(warmup):
+        request(client)
+
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with QueryCounter(db.engine) as counter:
+            start = time.perf_counter()
+            response = request(client)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        assert response.status_code == 200, response.status_code
+
+    # Memory is measured in its own pass since tracing slows every allocation down.
+    peaks = []
+    for _ in range(min(repeat, 20)):
+        tracemalloc.start()
+        request(client)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024.0)
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'requests': repeat,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'peak_kb_per_request': round(sorted(peaks)[len(peaks) // 2], 1),
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='fraction of the full dataset to generate')
+    parser.add_argument('--repeat', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--routes', nargs='+', help='subset of routes to run')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='defaults to a throwaway sqlite file')
+    parser.add_argument('--skip-generate', action='store_true', help='reuse the data already in --database-url')
+    parser.add_argument('--cache', action='store_true', help='keep the listing page cache on')
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'fyyur_bench.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not args.cache:
+        response_cache.backend = NullCache()
+
+    with app.app_context():
+        if args.skip_generate:
+            sizes = {table: model.query.count() for table, model in (('venues', Venue), ('artists', Artist), ('shows', Show))}
+        else:
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            sizes = generate(args.scale, args.seed)
+            print(f'generated {sizes} in {time.perf_counter() - start:.1f}s')
+
+        dialect = db.engine.dialect.name
+        results = {}
+        client = app.test_client()
+        for name, request in route_requests(sizes, args.seed).items():
+            if args.routes and name not in args.routes:
+                continue
+            results[name] = measure(request, client, args.repeat, args.warmup)
+            print(f'{name:>16}  p50 {results[name]["p50_ms"]:>8.2f} ms  p99 {results[name]["p99_ms"]:>8.2f} ms  '
+                  f'{results[name]["queries_per_request"]:>5} queries  {results[name]["peak_kb_per_request"]:>8.1f} KiB')
+
+    report = {
+        'commit': current_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'database': dialect,
+        'cache': args.cache,
+        'sizes': sizes,
+        'routes': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f'wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Venue name search latency as the table grows.
+
+Run from the starter_code directory:
+
+    python -m benchmarks.search
+    python -m benchmarks.search --sizes 1000 10000 --database-url postgresql://localhost:5432/fyyur_bench
+
+The table is filled with unrelated names plus a fixed number of "Musical Hop"
+venues, so every size returns the same result set and any growth in latency
+comes from the lookup itself.
+'''
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app import app
+from models import db, Venue
+from benchmarks.common import insert_batches, percentile
+
+WORDS = ['Blue', 'Note', 'Cellar', 'Velvet', 'Room', 'Echo', 'Lounge', 'Garage', 'Hall', 'Taproom',
+         'Underground', 'Attic', 'Loft', 'Basement', 'Stage', 'Corner', 'Harbor', 'Rooftop', 'Barn', 'Club']
+NEEDLES = 10
+
+
+def generate_venues(total):
+    rng = random.Random(total)
+    for i in range(total):
+        if i % max(total // NEEDLES, 1) == 0:
+            name = f'The Musical Hop {i}'
+        else:
+            name = ' '.join(rng.sample(WORDS, 3)) + f' {i}'
+        yield {'name': name, 'city': 'San Francisco', 'state': 'CA', 'seeking_talent': False}
+
+
+def time_search(term, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Venue.search_venues_by_name(term)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--term', default='Musical Hop')
+    parser.add_argument('--database-url', help='defaults to a throwaway sqlite file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    print(f'{"rows":>10} {"p50 ms":>10} {"p95 ms":>10} {"results":>8}')
+    for size in args.sizes:
+        app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url or 'sqlite:///' + os.path.join(workdir, f'search_{size}.db')
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            insert_batches(Venue.__table__, generate_venues(size))
+
+            results = Venue.search_venues_by_name(args.term)['count']
+            timings = sorted(time_search(args.term, args.repeat))
+            p50 = percentile(timings, 50)
+            p95 = percentile(timings, 95)
+            print(f'{size:>10} {p50:>10.2f} {p95:>10.2f} {results:>8}')
+
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import make_response, request, session
+
+#----------------------------------------------------------------------------#
+# Response cache for the listing pages.
+#
+# Pages are stored per route ("namespace") and dropped by the model methods
+# after a write commits, with a TTL as a backstop for shows that move from
+# upcoming to past without any write.
+#----------------------------------------------------------------------------#
+
+class LRUCache(object):
+    '''
+    In-process cache holding at most `max_entries` values, each for `ttl` seconds.
+    '''
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_namespace(self, namespace):
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == namespace]:
+                del self._entries[entry]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(object):
+    '''
+    Cache kept in a Redis compatible server so several app processes share it.
+    Needs the `redis` package.
+    '''
+
+    def __init__(self, url, ttl=60, prefix='fyyur:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, namespace, key):
+        return f'{self.prefix}{namespace}:{key}'
+
+    def get(self, namespace, key):
+        value = self.client.get(self._key(namespace, key))
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, namespace, key, value):
+        self.client.set(self._key(namespace, key), pickle.dumps(value), ex=self.ttl)
+
+    def delete_namespace(self, namespace):
+        keys = list(self.client.scan_iter(match=self._key(namespace, '*')))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f'{self.prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCache(object):
+    '''
+    Stores nothing, for benchmarking the uncached pages.
+    '''
+
+    def get(self, namespace, key):
+        return None
+
+    def set(self, namespace, key, value):
+        pass
+
+    def delete_namespace(self, namespace):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache(object):
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCache()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'simple')
+        ttl = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+        if cache_type == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'], ttl=ttl)
+        elif cache_type == 'simple':
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 256), ttl=ttl)
+        elif cache_type == 'null':
+            self.backend = NullCache()
+        else:
+            raise ValueError(f'Unknown CACHE_TYPE {cache_type!r}')
+
+    def cached(self, namespace):
+        # Route decorator, the key is the path including the query string.
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                # A page carrying one-off flash messages must not be served to anyone else.
+                if session.get('_flashes'):
+                    return f(*args, **kwargs)
+
+                body = self.backend.get(namespace, request.full_path)
+                if body is not None:
+                    self.hits[namespace] += 1
+                    response = make_response(body)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses[namespace] += 1
+                body = f(*args, **kwargs)
+                if isinstance(body, str):
+                    self.backend.set(namespace, request.full_path, body)
+                response = make_response(body)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.delete_namespace(namespace)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits.clear()
+        self.misses.clear()
+
+    def stats(self):
+        return {namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace]}
+                for namespace in set(self.hits) | set(self.misses)}
+
+
+response_cache = ResponseCache()
@@ -11,3 +11,11 @@ DEBUG = True
 
 # TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = 'postgres://shaun@localhost:5432/fyyurapp'
+
+# Response cache for the /venues, /artists and /shows listings.
+# 'simple' keeps pages in process, 'redis' shares them through CACHE_REDIS_URL (needs the redis package),
+# 'null' turns caching off.
+CACHE_TYPE = 'simple'
+CACHE_DEFAULT_TIMEOUT = 60
+CACHE_MAX_ENTRIES = 256
+CACHE_REDIS_URL = 'redis://localhost:6379/0'
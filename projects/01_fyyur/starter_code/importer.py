@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+from werkzeug.datastructures import MultiDict
+
+from cache import response_cache
+from forms import ArtistForm, ShowForm, VenueForm
+from models import db, resolve_genre_ids, artist_genre, venue_genre, Artist, Show, Venue
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+#   flask import venues venues.csv
+#   flask import shows shows.jsonl --batch-size 5000
+#
+# Rows are checked with the same forms the site uses, then written a batch at
+# a time: COPY on Postgres, executemany everywhere else.
+#----------------------------------------------------------------------------#
+
+IMPORTS = {
+    # kind: (form, table, genre association table, association column)
+    'venues': (VenueForm, Venue.__table__, venue_genre, 'venue_id'),
+    'artists': (ArtistForm, Artist.__table__, artist_genre, 'artist_id'),
+    'shows': (ShowForm, Show.__table__, None, None),
+}
+
+
+def read_rows(path, file_format):
+    # Yields (line number, form data) one row at a time so large files are never held in memory.
+    with open(path, newline='') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                formdata = MultiDict()
+                for key, value in row.items():
+                    if key == 'genres':
+                        formdata.setlist(key, [genre.strip() for genre in value.split(',') if genre.strip()])
+                    elif value != '':
+                        formdata[key] = value
+                yield reader.line_num, formdata
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                formdata = MultiDict()
+                for key, value in json.loads(line).items():
+                    if isinstance(value, list):
+                        formdata.setlist(key, [str(item) for item in value])
+                    elif isinstance(value, bool):
+                        formdata[key] = 'y' if value else 'false'
+                    elif value is not None:
+                        formdata[key] = str(value)
+                yield line_number, formdata
+
+
+def validate_row(form, formdata):
+    # The form is built once per import and refilled for every row, building one costs about as much as validating it.
+    form.process(formdata)
+    if not form.validate():
+        return None, ['{}: {}'.format(field, ' '.join(messages)) for field, messages in form.errors.items()]
+
+    values = dict(form.data)
+    if isinstance(form, ShowForm):
+        try:
+            values['artist_id'] = int(values['artist_id'])
+            values['venue_id'] = int(values['venue_id']) if values['venue_id'] else None
+        except (TypeError, ValueError):
+            return None, ['artist_id and venue_id must be integers.']
+    return values, []
+
+
+def reserve_ids(table, count):
+    # Ids are assigned up front so the genre association rows can be written in the same batch.
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        sequence = connection.execute(text('SELECT pg_get_serial_sequence(:table, \'id\')'),
+                                      table=f'"{table.name}"').scalar()
+        rows = connection.execute(text('SELECT nextval(:sequence) FROM generate_series(1, :count)'),
+                                  sequence=sequence, count=count)
+        return [row[0] for row in rows]
+    # SQLite has a single writer, so nothing else can take these ids while the import runs.
+    start = (connection.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def insert_rows(table, rows):
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        connection.execute(table.insert(), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(row[column]) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN'.format(table.name, ', '.join(f'"{c}"' for c in columns)), buffer)
+
+
+def write_batch(kind, batch):
+    # batch is a list of (line number, values); returns the rows written, reporting any it had to drop.
+    form_class, table, association, column = IMPORTS[kind]
+    if association is None:
+        insert_rows(table, [values for line_number, values in batch])
+        return len(batch)
+
+    known = resolve_genre_ids({genre for line_number, values in batch for genre in values['genres']})
+    rows = []
+    for line_number, values in batch:
+        unknown = [genre for genre in values['genres'] if genre not in known]
+        if unknown:
+            click.echo(f'line {line_number}: genres: unknown genre {", ".join(unknown)}', err=True)
+        else:
+            rows.append(values)
+    if not rows:
+        return 0
+
+    links = []
+    for row_id, values in zip(reserve_ids(table, len(rows)), rows):
+        values['id'] = row_id
+        links.extend({'genre_id': known[genre], column: row_id} for genre in values.pop('genres'))
+    insert_rows(table, rows)
+    if links:
+        insert_rows(association, links)
+    return len(rows)
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows written per transaction.')
+@with_appcontext
+def import_command(kind, path, file_format, batch_size):
+    """Bulk load venues, artists or shows from a CSV or JSONL file."""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    form = IMPORTS[kind][0](formdata=MultiDict(), meta={'csrf': False})
+
+    imported = 0
+    rejected = 0
+    start = time.perf_counter()
+
+    def flush(batch):
+        try:
+            written = write_batch(kind, batch)
+            db.session.commit()
+            return written
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f'lines {batch[0][0]}-{batch[-1][0]}: batch failed: {e}', err=True)
+            return 0
+
+    batch = []
+    for line_number, formdata in read_rows(path, file_format):
+        values, errors = validate_row(form, formdata)
+        if errors:
+            rejected += 1
+            for error in errors:
+                click.echo(f'line {line_number}: {error}', err=True)
+            continue
+        batch.append((line_number, values))
+        if len(batch) >= batch_size:
+            written = flush(batch)
+            imported += written
+            rejected += len(batch) - written
+            batch = []
+    if batch:
+        written = flush(batch)
+        imported += written
+        rejected += len(batch) - written
+
+    response_cache.invalidate('venues', 'artists', 'shows')
+    elapsed = time.perf_counter() - start
+    click.echo(f'Imported {imported} {kind} in {elapsed:.2f}s ({imported / elapsed:.0f} rows/sec), {rejected} rejected.')
@@ -0,0 +1,64 @@
+"""Show.start_time as an indexed timestamp
+
+Revision ID: 5b1e7d9c2a40
+Revises: 0c5a92b4b93b
+Create Date: 2026-10-18 09:12:37.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import dateutil.parser
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7d9c2a40'
+down_revision = '0c5a92b4b93b'
+branch_labels = None
+depends_on = None
+
+# Rows converted per round trip while backfilling, keeps the transaction log and memory bounded on large tables.
+BATCH_SIZE = 5000
+
+show = sa.table('Show',
+    sa.column('id', sa.Integer),
+    sa.column('start_time', sa.String),
+    sa.column('start_time_ts', sa.DateTime),
+)
+
+
+def backfill(source, target, convert):
+    # Walks the table by primary key so every batch is an index range scan rather than an OFFSET.
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([show.c.id, source])
+            .where(show.c.id > last_id)
+            .order_by(show.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        connection.execute(
+            show.update().where(show.c.id == sa.bindparam('show_id')).values({target.name: sa.bindparam('value')}),
+            [{'show_id': row[0], 'value': convert(row[1])} for row in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('start_time_ts', sa.DateTime(), nullable=True))
+    backfill(show.c.start_time, show.c.start_time_ts, dateutil.parser.parse)
+    op.drop_column('Show', 'start_time')
+    op.alter_column('Show', 'start_time_ts', new_column_name='start_time', nullable=False)
+    op.create_index(op.f('ix_Show_start_time'), 'Show', ['start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_Show_start_time'), table_name='Show')
+    op.alter_column('Show', 'start_time', new_column_name='start_time_ts')
+    op.add_column('Show', sa.Column('start_time', sa.String(), nullable=True))
+    backfill(show.c.start_time_ts, show.c.start_time, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+    op.drop_column('Show', 'start_time_ts')
+    op.alter_column('Show', 'start_time', nullable=False)
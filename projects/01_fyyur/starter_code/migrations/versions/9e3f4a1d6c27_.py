@@ -0,0 +1,29 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: 9e3f4a1d6c27
+Revises: 5b1e7d9c2a40
+Create Date: 2026-10-18 11:40:02.031964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3f4a1d6c27'
+down_revision = '5b1e7d9c2a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
@@ -0,0 +1,26 @@
+"""(start_time, id) index for keyset pagination of shows
+
+Revision ID: c47a2e8f1b93
+Revises: 9e3f4a1d6c27
+Create Date: 2026-10-18 14:05:51.662190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a2e8f1b93'
+down_revision = '9e3f4a1d6c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+    op.drop_index(op.f('ix_Show_start_time'), table_name='Show')
+
+
+def downgrade():
+    op.create_index(op.f('ix_Show_start_time'), 'Show', ['start_time'], unique=False)
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
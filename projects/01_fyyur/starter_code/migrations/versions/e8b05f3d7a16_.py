@@ -0,0 +1,26 @@
+"""indexes on the Show foreign keys
+
+Revision ID: e8b05f3d7a16
+Revises: c47a2e8f1b93
+Create Date: 2026-10-18 17:26:40.518733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b05f3d7a16'
+down_revision = 'c47a2e8f1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_Show_artist_id'), 'Show', ['artist_id'], unique=False)
+    op.create_index(op.f('ix_Show_venue_id'), 'Show', ['venue_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_Show_venue_id'), table_name='Show')
+    op.drop_index(op.f('ix_Show_artist_id'), table_name='Show')
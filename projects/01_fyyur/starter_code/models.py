@@ -2,9 +2,15 @@
 from collections import defaultdict
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, event, func, tuple_
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from cache import response_cache
+from search import match_name, register_name_search, search_count
 
 db = SQLAlchemy()
 
+SHOWS_PER_PAGE = 30
+
 venue_genre = db.Table('venue_genre',
     db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
     db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True)
@@ -20,6 +26,9 @@ artist_genre = db.Table('artist_genre',
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -53,6 +62,7 @@ class Artist(db.Model):
 
         try:
             db.session.commit()
+            response_cache.invalidate('artists', 'shows')
             return f'Artist {form_data["name"]} was successfully updated!'
         except Exception as e:
             db.session.rollback()
@@ -77,6 +87,7 @@ class Artist(db.Model):
         try:
             db.session.add(artist)
             db.session.commit()
+            response_cache.invalidate('artists')
             # on successful db insert, flash success
             return f'Artist {form_data["name"]} was successfully listed!'
         except Exception as e:
@@ -88,25 +99,8 @@ class Artist(db.Model):
 
     def get_artist(artist_id):
         current_time = datetime.now()
-        artist = Artist.query.filter_by(id=artist_id).first()
-        
-        p_shows = []
-        up_shows = []
-
-        # Looping over the shows to find the past shows.  I would have rather used the date to figure the past show but
-        # wanted to display the same state of the site from the example code. 
-        for show in artist.shows:
-            venue = show.Venues_shows
-            temp = show.__dict__
-            temp['venue_id'] = venue.id
-            temp['venue_name'] = venue.name
-            temp['venue_image_link'] = venue.image_link
-            # Format the string to the example format had to trim some of the microsecond percision hense the -5 from the end of the string.
-            temp_time = show.start_time
-            if datetime.strptime(show.start_time, '%Y-%m-%d %H:%S:%M') < current_time:
-                p_shows.append(temp)
-            else:
-                up_shows.append(temp)
+        artist = Artist.query.options(joinedload(Artist.genres)).filter_by(id=artist_id).first()
+        p_shows, up_shows = Show.get_past_and_upcoming(Show.artist_id == artist_id, current_time)
 
         # Filling out the dict manualy rather then using the __dict__ conversion since we probably don't want to push all the table info the 
         # client browser.
@@ -130,23 +124,31 @@ class Artist(db.Model):
         return data
 
     def search_artists_by_name(search_term):
-        artists = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
         current_time = datetime.now()
+        artists = db.session.query(Artist.id,
+        Artist.name,
+        func.count(Show.id).label('num_upcoming_shows'))\
+        .outerjoin(Show, and_(Show.artist_id == Artist.id, Show.start_time > current_time))\
+        .group_by(Artist.id, Artist.name)
+        artists = match_name(artists, Artist, search_term).all()
+
         data = []
         for artist in artists:
             d = {}
             d['id'] = artist.id
             d['name'] = artist.name
-            d['num_upcoming_shows'] = sum(1 for show in artist.shows if datetime.strptime(show.start_time, '%Y-%m-%d %H:%S:%M') > current_time)
+            d['num_upcoming_shows'] = artist.num_upcoming_shows
             data.append(d)
 
         response={
-            "count": len(artists),
+            "count": search_count(db.session, Artist, search_term, artists),
             "data": data
         }
 
         return response
 
+register_name_search(Artist.__table__)
+
 
 #  Genre
 #  ----------------------------------------------------------------
@@ -160,23 +162,68 @@ def genres_to_string(obj_genres):
     return [ sub.name for sub in obj_genres ]
 
 
+# The Genre table is tiny and nearly static, so name -> id lookups are kept in process and
+# dropped whenever a Genre row is written through the ORM.
+genre_ids = {}
+
+@event.listens_for(Genre, 'after_insert')
+@event.listens_for(Genre, 'after_update')
+@event.listens_for(Genre, 'after_delete')
+def invalidate_genre_ids(mapper, connection, target):
+    genre_ids.clear()
+
+
+def resolve_genre_ids(str_genres):
+    # Any names not cached yet are resolved together with a single IN query.
+    missing = set(genre for genre in str_genres if genre not in genre_ids)
+    if missing:
+        for genre_id, name in db.session.query(Genre.id, Genre.name).filter(Genre.name.in_(missing)):
+            genre_ids[name] = genre_id
+    return {genre: genre_ids[genre] for genre in str_genres if genre in genre_ids}
+
+
 def string_to_genres(str_genres):
+    resolve_genre_ids(str_genres)
+
     genres = []
     for genre in str_genres:
-        o_genre = Genre.query.filter_by(name=genre).first()
-        genres.append(o_genre)
+        if genre in genre_ids:
+            # Attach the known row to the session without loading it again.
+            o_genre = Genre(id=genre_ids[genre], name=genre)
+            make_transient_to_detached(o_genre)
+            genres.append(db.session.merge(o_genre, load=False))
     return genres
 
 
 #  Show
 #  ----------------------------------------------------------------
+class ShowRow(object):
+    # Show payload handed to the templates. It only holds plain values copied out of a query row, so it never
+    # references session state and can be cached; __slots__ keeps it to a fixed set of fields with no per-row dict.
+    __slots__ = ('id', 'start_time', 'venue_id', 'venue_name', 'venue_image_link', 'artist_id', 'artist_name', 'artist_image_link')
+
+    def __init__(self, id, start_time, venue_id, venue_name, venue_image_link, artist_id, artist_name, artist_image_link):
+        self.id = id
+        self.start_time = start_time
+        self.venue_id = venue_id
+        self.venue_name = venue_name
+        self.venue_image_link = venue_image_link
+        self.artist_id = artist_id
+        self.artist_name = artist_name
+        self.artist_image_link = artist_image_link
+
+
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        # Serves both the start_time range predicates and the (start_time, id) keyset order of the show listing.
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.String, nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False, index=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=True, index=True)
 
     def create_show(form_data):
         show = Show()
@@ -187,42 +234,65 @@ class Show(db.Model):
         try:
             db.session.add(show)
             db.session.commit()
+            response_cache.invalidate('shows', 'venues')
             # on successful db insert, flash success
             return 'Show was successfully listed!'
         except Exception as e:
-            return 'An error occurred. Show could not be listed.'
             db.session.rollback()
+            return 'An error occurred. Show could not be listed.'
         finally:
             db.session.close()
 
-    def get_show_list():
-        shows = db.session.query(Show.start_time.label('start_time'),
-        Venue.id.label('venue_id'),
-        Venue.name.label('venue_name'),
-        Artist.id.label('artist_id'),
-        Artist.name.label('artist_name'),
-        Artist.image_link.label('artist_image_link'))\
-        .join(Artist, Venue).all()
-
-        data = []
-        for show in shows:
-            temp={
-                "venue_id": show.venue_id,
-                "venue_name": show.venue_name,
-                "artist_id": show.artist_id,
-                "artist_name": show.artist_name,
-                "artist_image_link": show.artist_image_link,
-                "start_time": show.start_time
-            }
-            data.append(temp)
-
-        return data
+    def select_show_rows():
+        # Column order matches ShowRow's constructor.
+        return db.session.query(Show.id,
+        Show.start_time,
+        Venue.id,
+        Venue.name,
+        Venue.image_link,
+        Artist.id,
+        Artist.name,
+        Artist.image_link)\
+        .join(Artist, Venue)
+
+    def get_past_and_upcoming(criterion, current_time):
+        # Past and upcoming shows are two range scans on the start_time index, each joined to the artist and venue
+        # so a detail page costs the same number of queries for any number of shows.
+        shows = Show.select_show_rows().filter(criterion).order_by(Show.start_time)
+        past_shows = [ShowRow(*show) for show in shows.filter(Show.start_time < current_time)]
+        upcoming_shows = [ShowRow(*show) for show in shows.filter(Show.start_time >= current_time)]
+        return past_shows, upcoming_shows
+
+    def encode_cursor(show):
+        return f'{show.start_time.isoformat()}_{show.id}'
+
+    def decode_cursor(cursor):
+        # Raises ValueError for anything that wasn't produced by encode_cursor.
+        start_time, show_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+
+    def get_show_list(after=None, upcoming_only=True, per_page=SHOWS_PER_PAGE):
+        # Keyset pagination: each page continues from the (start_time, id) of the last row of the previous one,
+        # so a page costs one index range scan of per_page rows however many shows came before it.
+        shows = Show.select_show_rows()
+        if upcoming_only:
+            shows = shows.filter(Show.start_time >= datetime.now())
+        if after:
+            shows = shows.filter(tuple_(Show.start_time, Show.id) > tuple_(*after))
+        shows = shows.order_by(Show.start_time, Show.id).limit(per_page + 1).all()
+
+        data = [ShowRow(*show) for show in shows[:per_page]]
+        next_cursor = Show.encode_cursor(data[-1]) if len(shows) > per_page else None
+        return data, next_cursor
 
 
 #  Venue
 #  ----------------------------------------------------------------
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -242,6 +312,7 @@ class Venue(db.Model):
         try:
             db.session.query(Venue).filter(Venue.id == venue_id).delete(False)
             db.session.commit()
+            response_cache.invalidate('venues', 'shows')
             return 'Venue was successfully deleted!'
         except Exception as e:
             db.session.rollback()
@@ -266,6 +337,7 @@ class Venue(db.Model):
 
         try:
             db.session.commit()
+            response_cache.invalidate('venues', 'shows')
             return f'Venue {form_data["name"]} was successfully updated!'
         except Exception as e:
             db.session.rollback()
@@ -292,6 +364,7 @@ class Venue(db.Model):
         try:
             db.session.add(venue)
             db.session.commit()
+            response_cache.invalidate('venues')
             # on successful db insert, flash success
             return f'Venue {form_data["name"]} was successfully listed!'
         except Exception as e:
@@ -301,43 +374,58 @@ class Venue(db.Model):
             db.session.close()
 
     def search_venues_by_name(search_term):
-        venues = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%S:%M')
+        current_time = datetime.now()
+        venues = db.session.query(Venue.id,
+        Venue.name,
+        func.count(Show.id).label('num_upcoming_shows'))\
+        .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > current_time))\
+        .group_by(Venue.id, Venue.name)
+        venues = match_name(venues, Venue, search_term).all()
 
         data = []
         for venue in venues:
             d = {}
             d['id'] = venue.id
             d['name'] = venue.name
-            d['num_upcoming_shows'] = sum(1 for i in venue.shows if i.start_time > current_time)
+            d['num_upcoming_shows'] = venue.num_upcoming_shows
             data.append(d)
 
         response={
-            "count": len(venues),
+            "count": search_count(db.session, Venue, search_term, venues),
             "data": data
         }
 
         return response
 
     def get_venue_list():
-        venues = db.session.query(Venue).all()
+        # One grouped query: the upcoming show count is computed by the database in the outer join
+        # rather than by loading every venue's shows and comparing them in python.
+        current_time = datetime.now()
+        venues = db.session.query(Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        func.count(Show.id).label('num_upcoming_shows'))\
+        .outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > current_time))\
+        .group_by(Venue.id, Venue.name, Venue.city, Venue.state)\
+        .order_by(Venue.state, Venue.city, Venue.id).all()
 
         citys = defaultdict(list)
-        current_time = datetime.now()
         # Grouping venues by cities
         for venue in venues:
             city = {}
             city['id'] = venue.id
             city['name'] = venue.name
-            city['num_upcoming_shows'] = sum(1 for show in venue.shows if datetime.strptime(show.start_time, '%Y-%m-%d %H:%S:%M') > current_time)
+            city['num_upcoming_shows'] = venue.num_upcoming_shows
 
-            citys[f"{venue.city},{venue.state}"].append(city)
+            citys[(venue.city, venue.state)].append(city)
 
         #creating required data format for venues page.
         data = []
-        for city_state, venues in citys.items():
+        for (city, state), venues in citys.items():
             temp = {}
-            temp['city'], temp['state'] = city_state.split(',')
+            temp['city'] = city
+            temp['state'] = state
             temp['venues'] = venues
             data.append(temp)
         
@@ -346,22 +434,8 @@ class Venue(db.Model):
     def get_venue(venue_id):
         #returns a venue with the givin id.
         current_time = datetime.now()
-        venue = Venue.query.filter_by(id=venue_id).first()
-
-        p_shows = []
-        up_shows = []
-
-        for show in venue.shows:
-            artist = show.Artists
-            temp = show.__dict__
-            temp['artist_id'] = artist.id
-            temp['artist_name'] = artist.name
-            temp['artist_image_link'] = artist.image_link
-            temp_time = show.start_time
-            if datetime.strptime(show.start_time, '%Y-%m-%d %H:%S:%M') < current_time:
-                p_shows.append(temp)
-            else:
-                up_shows.append(temp)
+        venue = Venue.query.options(joinedload(Venue.genres)).filter_by(id=venue_id).first()
+        p_shows, up_shows = Show.get_past_and_upcoming(Show.venue_id == venue_id, current_time)
 
         data = {
             "id": venue.id,
@@ -381,4 +455,6 @@ class Venue(db.Model):
             "past_shows_count": len(p_shows),
             "upcoming_shows_count": len(up_shows),
         }
-        return data
\ No newline at end of file
+        return data
+
+register_name_search(Venue.__table__)
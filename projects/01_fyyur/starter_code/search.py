@@ -0,0 +1,87 @@
+from sqlalchemy import DDL, Float, Integer, event, func, text
+
+#----------------------------------------------------------------------------#
+# Name search.
+#
+# Postgres answers the ILIKE filter from a pg_trgm GIN index and ranks by
+# trigram similarity. SQLite (used for local tests and benchmarks) mirrors the
+# searched column into an FTS5 trigram table kept in sync by triggers.
+#----------------------------------------------------------------------------#
+
+# Upper bound on the rows a search returns, so a very common term can't pull the whole table.
+SEARCH_RESULTS_LIMIT = 50
+
+# Trigram indexes can only help once the term is at least one trigram long.
+MIN_INDEXED_TERM_LENGTH = 3
+
+
+def register_name_search(table, column='name'):
+    # Creates the search structures alongside the table whenever create_all/drop_all runs.
+    fts = f'{table.name}_fts'
+    statements = [
+        f'CREATE VIRTUAL TABLE "{fts}" USING fts5({column}, content=\'{table.name}\', content_rowid=\'id\', tokenize=\'trigram\')',
+        f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table.name}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, {column}) VALUES (new.id, new.{column}); END',
+        f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table.name}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {column}) VALUES (\'delete\', old.id, old.{column}); END',
+        f'CREATE TRIGGER "{fts}_au" AFTER UPDATE OF {column} ON "{table.name}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {column}) VALUES (\'delete\', old.id, old.{column}); '
+        f'INSERT INTO "{fts}"(rowid, {column}) VALUES (new.id, new.{column}); END',
+    ]
+    event.listen(table, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+    for statement in statements:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(table, 'before_drop', DDL(f'DROP TABLE IF EXISTS "{fts}"').execute_if(dialect='sqlite'))
+
+
+def like_pattern(search_term):
+    # Escape the LIKE wildcards so a search for "100%" means the literal string.
+    escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def filter_name(query, model, search_term):
+    '''
+    Filters a query over `model` down to rows whose name contains `search_term`.
+    Returns the filtered query and the order_by clauses that put the best matches first.
+    '''
+    dialect = query.session.get_bind().dialect.name
+
+    if dialect == 'sqlite' and len(search_term) >= MIN_INDEXED_TERM_LENGTH:
+        fts = f'{model.__tablename__}_fts'
+        phrase = '"{}"'.format(search_term.replace('"', '""'))
+        matches = text(f'SELECT rowid AS id, rank FROM "{fts}" WHERE "{fts}" MATCH :phrase')\
+            .columns(id=Integer, rank=Float)\
+            .bindparams(phrase=phrase)\
+            .alias('matches')
+        return query.join(matches, matches.c.id == model.id), (matches.c.rank, model.id)
+
+    query = query.filter(model.name.ilike(like_pattern(search_term), escape='\\'))
+    if dialect == 'postgresql':
+        return query, (func.similarity(model.name, search_term).desc(), model.id)
+    return query, (model.name, model.id)
+
+
+def match_name(query, model, search_term, limit=SEARCH_RESULTS_LIMIT):
+    '''
+    Filters a query over `model` down to rows whose name contains `search_term`,
+    best matches first, capped at `limit` rows.
+    '''
+    query, order_by = filter_name(query, model, search_term)
+    return query.order_by(*order_by).limit(limit)
+
+
+def count_name_matches(session, model, search_term):
+    '''
+    The number of `model` rows whose name contains `search_term`, without the
+    cap match_name applies.
+    '''
+    query, _ = filter_name(session.query(func.count(model.id)).select_from(model), model, search_term)
+    return query.scalar()
+
+
+def search_count(session, model, search_term, results, limit=SEARCH_RESULTS_LIMIT):
+    # Only a capped result list needs the extra count query; below the cap its length is exact.
+    if len(results) < limit:
+        return len(results)
+    return count_name_matches(session, model, search_term)
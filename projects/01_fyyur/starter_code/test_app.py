@@ -0,0 +1,381 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app
+from cache import response_cache, LRUCache
+from models import db, genre_ids, string_to_genres, Artist, Genre, Show, Venue
+from search import SEARCH_RESULTS_LIMIT
+
+
+class QueryCounter(object):
+    """Counts the statements sent to the database while the block is active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the fyyur test case"""
+
+    def setUp(self):
+        """Define test variables and initialize app."""
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.client = app.test_client
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        response_cache.clear()
+
+    def tearDown(self):
+        """Executed after reach test"""
+        genre_ids.clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add_venues(self, count, shows_per_venue, city='San Francisco', state='CA'):
+        artist = Artist(name='Guns N Petals', seeking_venue=False)
+        db.session.add(artist)
+        db.session.flush()
+        past = datetime.now() - timedelta(days=30)
+        upcoming = datetime.now() + timedelta(days=30)
+        for i in range(count):
+            venue = Venue(name=f'Venue {i}', city=city, state=state, seeking_talent=False)
+            db.session.add(venue)
+            db.session.flush()
+            for j in range(shows_per_venue):
+                db.session.add(Show(artist_id=artist.id, venue_id=venue.id, start_time=upcoming if j % 2 else past))
+        db.session.commit()
+
+    def test_venue_list_groups_by_city_and_counts_upcoming_shows(self):
+        self.add_venues(2, 4)
+        self.add_venues(1, 0, city='New York', state='NY')
+
+        data = Venue.get_venue_list()
+
+        self.assertEqual([(area['city'], area['state']) for area in data],
+                         [('San Francisco', 'CA'), ('New York', 'NY')])
+        self.assertEqual([venue['num_upcoming_shows'] for venue in data[0]['venues']], [2, 2])
+        self.assertEqual(data[1]['venues'][0]['num_upcoming_shows'], 0)
+
+    def test_venue_list_query_count_is_constant(self):
+        self.add_venues(2, 2)
+        with QueryCounter(db.engine) as small:
+            Venue.get_venue_list()
+
+        self.add_venues(50, 20)
+        with QueryCounter(db.engine) as large:
+            Venue.get_venue_list()
+
+        self.assertEqual(small.count, 1)
+        self.assertEqual(large.count, small.count)
+
+    def test_get_venues_page(self):
+        self.add_venues(3, 2)
+        res = self.client().get('/venues')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'Venue 2', res.data)
+
+    def test_get_shows_page_formats_timestamps(self):
+        self.add_venues(1, 2)
+        res = self.client().get('/shows')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'Guns N Petals', res.data)
+
+    def test_search_venues_ranks_matches_and_counts_upcoming_shows(self):
+        self.add_venues(1, 2)
+        db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', seeking_talent=False))
+        db.session.add(Venue(name='Park Square Live Music & Coffee', city='New York', state='NY', seeking_talent=False))
+        db.session.commit()
+
+        response = Venue.search_venues_by_name('music')
+        self.assertEqual(response['count'], 2)
+        self.assertEqual({venue['name'] for venue in response['data']},
+                         {'The Musical Hop', 'Park Square Live Music & Coffee'})
+
+        response = Venue.search_venues_by_name('Hop')
+        self.assertEqual([venue['name'] for venue in response['data']], ['The Musical Hop'])
+
+        response = Venue.search_venues_by_name('venue 0')
+        self.assertEqual(response['data'], [{'id': 1, 'name': 'Venue 0', 'num_upcoming_shows': 1}])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', seeking_talent=False)
+        db.session.add(venue)
+        db.session.commit()
+        venue.name = 'The Dueling Pianos Bar'
+        db.session.commit()
+
+        self.assertEqual(Venue.search_venues_by_name('Hop')['count'], 0)
+        self.assertEqual(Venue.search_venues_by_name('Pianos')['count'], 1)
+
+        Venue.delete_venue(venue.id)
+        self.assertEqual(Venue.search_venues_by_name('Pianos')['count'], 0)
+
+    def test_search_artists_short_term_and_wildcards(self):
+        for name in ('Guns N Petals', 'Matt Quevedo', 'The Wild Sax Band', '100% Band'):
+            db.session.add(Artist(name=name, seeking_venue=False))
+        db.session.commit()
+
+        response = Artist.search_artists_by_name('A')
+        self.assertEqual(response['count'], 4)
+
+        response = Artist.search_artists_by_name('band')
+        self.assertEqual(response['count'], 2)
+
+        response = Artist.search_artists_by_name('0%')
+        self.assertEqual([artist['name'] for artist in response['data']], ['100% Band'])
+
+    def test_search_count_is_not_capped_by_results_limit(self):
+        for i in range(SEARCH_RESULTS_LIMIT + 10):
+            db.session.add(Artist(name=f'Band {i}', seeking_venue=False))
+            db.session.add(Venue(name=f'Hall {i}', city='New York', state='NY', seeking_talent=False))
+        db.session.commit()
+
+        for response in (Artist.search_artists_by_name('Band'), Artist.search_artists_by_name('B'),
+                         Venue.search_venues_by_name('Hall')):
+            self.assertEqual(len(response['data']), SEARCH_RESULTS_LIMIT)
+            self.assertEqual(response['count'], SEARCH_RESULTS_LIMIT + 10)
+
+    def test_venue_detail_splits_past_and_upcoming_shows(self):
+        self.add_venues(1, 5)
+
+        venue = Venue.get_venue(1)
+
+        self.assertEqual(venue['past_shows_count'], 3)
+        self.assertEqual(venue['upcoming_shows_count'], 2)
+        self.assertEqual(venue['upcoming_shows'][0].artist_name, 'Guns N Petals')
+
+    def test_detail_payloads_do_not_touch_session_state(self):
+        self.add_venues(1, 2)
+        db.session.expunge_all()
+
+        venue = Venue.get_venue(1)
+        show = venue['past_shows'][0]
+
+        self.assertFalse(hasattr(show, '__dict__'))
+        self.assertEqual((show.venue_id, show.artist_id), (1, 1))
+        self.assertFalse([obj for obj in db.session if isinstance(obj, Show)])
+
+    def test_detail_pages_query_count_is_constant(self):
+        self.add_venues(1, 1)
+        with QueryCounter(db.engine) as venue_small:
+            Venue.get_venue(1)
+        with QueryCounter(db.engine) as artist_small:
+            Artist.get_artist(1)
+
+        self.add_venues(1, 40)
+        with QueryCounter(db.engine) as venue_large:
+            Venue.get_venue(2)
+        with QueryCounter(db.engine) as artist_large:
+            Artist.get_artist(2)
+
+        self.assertEqual(venue_small.count, 3)
+        self.assertEqual(venue_large.count, venue_small.count)
+        self.assertEqual(artist_small.count, 3)
+        self.assertEqual(artist_large.count, artist_small.count)
+
+    def test_get_venue_and_artist_pages(self):
+        self.add_venues(1, 4)
+
+        res = self.client().get('/venues/1')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'2 Upcoming Shows', res.data)
+
+        res = self.client().get('/artists/1')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'2 Past Shows', res.data)
+
+    def test_string_to_genres_resolves_names_in_one_query(self):
+        for name in ('Jazz', 'Reggae', 'Swing', 'Folk'):
+            db.session.add(Genre(name=name))
+        db.session.commit()
+
+        with QueryCounter(db.engine) as cold:
+            genres = string_to_genres(['Jazz', 'Swing', 'Folk'])
+        with QueryCounter(db.engine) as warm:
+            string_to_genres(['Jazz', 'Swing', 'Folk'])
+
+        self.assertEqual([genre.name for genre in genres], ['Jazz', 'Swing', 'Folk'])
+        self.assertEqual(cold.count, 1)
+        self.assertEqual(warm.count, 0)
+
+    def test_genre_cache_is_invalidated_on_genre_changes(self):
+        jazz = Genre(name='Jazz')
+        db.session.add(jazz)
+        db.session.commit()
+        string_to_genres(['Jazz'])
+
+        jazz.name = 'Hip-Hop'
+        db.session.commit()
+
+        self.assertEqual(string_to_genres(['Jazz']), [])
+        self.assertEqual([genre.id for genre in string_to_genres(['Hip-Hop'])], [jazz.id])
+
+    def test_create_venue_with_cached_genres(self):
+        for name in ('Jazz', 'Reggae'):
+            db.session.add(Genre(name=name))
+        db.session.commit()
+        string_to_genres(['Jazz'])
+
+        form_data = {'genres': ['Jazz', 'Reggae'], 'address': '1015 Folsom Street', 'name': 'The Musical Hop',
+                     'city': 'San Francisco', 'state': 'CA', 'phone': '123-123-1234', 'facebook_link': None,
+                     'image_link': None, 'website': None, 'seeking_talent': True, 'seeking_description': None}
+        response = Venue.create_venue(form_data)
+
+        self.assertEqual(response, 'Venue The Musical Hop was successfully listed!')
+        self.assertEqual(Venue.get_venue(1)['genres'], ['Jazz', 'Reggae'])
+        self.assertEqual(Genre.query.count(), 2)
+
+    def test_show_list_pages_through_every_show_once(self):
+        self.add_venues(3, 10)
+        seen = []
+        after = None
+        while True:
+            shows, after = Show.get_show_list(after and Show.decode_cursor(after), upcoming_only=False, per_page=7)
+            seen.extend((show.start_time, show.id) for show in shows)
+            self.assertLessEqual(len(shows), 7)
+            if not after:
+                break
+
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, sorted(set(seen)))
+
+    def test_show_list_defaults_to_upcoming_shows(self):
+        self.add_venues(2, 4)
+
+        shows, next_cursor = Show.get_show_list()
+
+        self.assertEqual(len(shows), 4)
+        self.assertIsNone(next_cursor)
+        self.assertTrue(all(show.start_time > datetime.now() for show in shows))
+
+    def test_get_shows_page_links_to_next_page(self):
+        self.add_venues(1, 80)
+
+        res = self.client().get('/shows?view=all')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'Next', res.data)
+
+        res = self.client().get('/shows?after=not-a-cursor')
+        self.assertEqual(res.status_code, 400)
+
+    def test_listing_pages_are_cached_until_a_write_commits(self):
+        self.add_venues(1, 2)
+
+        res = self.client().get('/venues')
+        self.assertEqual(res.headers['X-Cache'], 'MISS')
+        with QueryCounter(db.engine) as counter:
+            res = self.client().get('/venues')
+        self.assertEqual(res.headers['X-Cache'], 'HIT')
+        self.assertEqual(counter.count, 0)
+
+        form_data = {'genres': [], 'address': '1015 Folsom Street', 'name': 'The Musical Hop',
+                     'city': 'San Francisco', 'state': 'CA', 'phone': '123-123-1234', 'facebook_link': None,
+                     'image_link': None, 'website': None, 'seeking_talent': True, 'seeking_description': None}
+        Venue.create_venue(form_data)
+
+        res = self.client().get('/venues')
+        self.assertEqual(res.headers['X-Cache'], 'MISS')
+        self.assertIn(b'The Musical Hop', res.data)
+        self.assertEqual(response_cache.stats()['venues'], {'hits': 1, 'misses': 2})
+
+    def test_listing_pages_are_cached_per_query_string(self):
+        self.add_venues(1, 2)
+
+        self.client().get('/shows')
+        res = self.client().get('/shows?view=all')
+
+        self.assertEqual(res.headers['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['shows'], {'hits': 0, 'misses': 2})
+
+    def test_lru_cache_evicts_oldest_and_expires_entries(self):
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set('venues', '/a', 'a')
+        cache.set('venues', '/b', 'b')
+        cache.get('venues', '/a')
+        cache.set('shows', '/c', 'c')
+
+        self.assertEqual(cache.get('venues', '/a'), 'a')
+        self.assertIsNone(cache.get('venues', '/b'))
+
+        cache.delete_namespace('venues')
+        self.assertIsNone(cache.get('venues', '/a'))
+        self.assertEqual(cache.get('shows', '/c'), 'c')
+
+        cache.ttl = -1
+        cache.set('shows', '/c', 'c')
+        self.assertIsNone(cache.get('shows', '/c'))
+
+    def write_import_file(self, name, content):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_import_venues_from_csv(self):
+        for name in ('Jazz', 'Reggae'):
+            db.session.add(Genre(name=name))
+        db.session.commit()
+        path = self.write_import_file('venues.csv', '\n'.join([
+            'name,city,state,address,phone,genres,facebook_link,website,seeking_talent',
+            'The Musical Hop,San Francisco,CA,1015 Folsom Street,123-123-1234,"Jazz,Reggae",'
+            'https://www.facebook.com/TheMusicalHop,https://www.themusicalhop.com,true',
+            'The Dueling Pianos Bar,New York,NY,335 Delancey Street,914-003-1132,Jazz,'
+            'https://www.facebook.com/theduelingpianos,https://www.theduelingpianos.com,',
+            ',San Francisco,CA,34 Whiskey Moore Ave,415-000-1234,Jazz,'
+            'https://www.facebook.com/ParkSquare,https://www.parksquarelivemusicandcoffee.com,',
+            'Park Square Live Music,San Francisco,CA,34 Whiskey Moore Ave,415-000-1234,Swing,'
+            'https://www.facebook.com/ParkSquare,https://www.parksquarelivemusicandcoffee.com,',
+        ]))
+
+        result = app.test_cli_runner(mix_stderr=False).invoke(args=['import', 'venues', path, '--batch-size', '2'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 2 venues', result.output)
+        self.assertIn('line 4: name:', result.stderr)
+        self.assertIn('line 5: genres: unknown genre Swing', result.stderr)
+        self.assertEqual(Venue.get_venue(1)['genres'], ['Jazz', 'Reggae'])
+        self.assertFalse(Venue.get_venue(2)['seeking_talent'])
+        self.assertEqual(Venue.search_venues_by_name('Pianos')['count'], 1)
+
+    def test_import_shows_from_jsonl(self):
+        self.add_venues(1, 0)
+        path = self.write_import_file('shows.jsonl', '\n'.join([
+            '{"artist_id": 1, "venue_id": 1, "start_time": "2035-04-01 20:00:00"}',
+            '{"artist_id": 1, "venue_id": 1, "start_time": "2035-04-08 20:00:00"}',
+            '{"artist_id": "one", "venue_id": 1, "start_time": "2035-04-15 20:00:00"}',
+            '',
+        ]))
+
+        result = app.test_cli_runner(mix_stderr=False).invoke(args=['import', 'shows', path])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 2 shows', result.output)
+        self.assertIn('line 3: artist_id and venue_id must be integers.', result.stderr)
+        self.assertEqual(Venue.get_venue(1)['upcoming_shows_count'], 2)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+'''
+Encode throughput of the JSON providers for typical API payloads.
+
+Run from the backend directory:
+
+    python -m benchmarks.json_encoding
+    python -m benchmarks.json_encoding --seconds 2
+
+Payloads are built in memory to match what the trivia and coffee shop
+endpoints return, and encoded through flask.json.dumps exactly as jsonify does
+with each provider registered in turn. No database is needed.
+'''
+import argparse
+import json
+import time
+
+from flask import Flask
+from flask import json as flask_json
+
+from json_provider import ENCODERS, init_json
+
+
+def question(i):
+    return {'id': i, 'question': f'Whose autobiography is entitled "I Know Why the Caged Bird Sings" #{i}?',
+            'answer': 'Maya Angelou', 'category': i % 6 + 1, 'difficulty': i % 5 + 1}
+
+
+def drink(i):
+    return {'id': i, 'title': f'Water {i}',
+            'recipe': [{'name': 'water', 'color': 'blue', 'parts': 1}, {'name': 'milk', 'color': 'white', 'parts': 2}]}
+
+
+CATEGORIES = {1: 'Science', 2: 'Art', 3: 'Geography', 4: 'History', 5: 'Entertainment', 6: 'Sports'}
+PAYLOADS = {
+    'categories': {'success': True, 'categories': CATEGORIES},
+    'questions_page': {'success': True, 'questions': [question(i) for i in range(10)], 'categories': CATEGORIES,
+                       'total_questions': 19, 'current_category': 1},
+    'category_1000': {'success': True, 'questions': [question(i) for i in range(1000)],
+                      'current_category': '1', 'total_questions': 1000},
+    'drinks_long_100': {'success': True, 'drinks': [drink(i) for i in range(100)]},
+}
+
+
+def throughput(payload, seconds):
+    # Returns encodes per second.
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(10):
+            flask_json.dumps(payload)
+        calls += 10
+    elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=1.0, help='time spent on each payload and provider')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    results = {}
+    for provider in sorted(ENCODERS):
+        app.config['JSON_PROVIDER'] = provider
+        init_json(app)
+        with app.app_context():
+            for name, payload in PAYLOADS.items():
+                # Both providers must produce the same document.
+                assert json.loads(flask_json.dumps(payload)) == json.loads(json.dumps(payload, sort_keys=True))
+                results[name, provider] = throughput(payload, args.seconds)
+
+    print(f'{"payload":>16} ' + ' '.join(f'{provider + " ops/s":>16}' for provider in sorted(ENCODERS)) + f'{"speedup":>10}')
+    for name in PAYLOADS:
+        rates = [results[name, provider] for provider in sorted(ENCODERS)]
+        speedup = f'{rates[0] / rates[-1]:>9.1f}x' if 'orjson' in ENCODERS else ''
+        print(f'{name:>16} ' + ' '.join(f'{rate:>16,.0f}' for rate in rates) + speedup)
+
+
+if __name__ == '__main__':
+    main()
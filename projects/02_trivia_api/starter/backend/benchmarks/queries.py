@@ -0,0 +1,90 @@
+'''
+Per-request time of the hot trivia endpoints with and without baked queries.
+
+Run from the backend directory:
+
+    python -m benchmarks.queries
+    python -m benchmarks.queries --requests 2000 --database-url postgresql://localhost:5432/trivia_bench
+
+Requests go through the Flask test client against a small generated question
+bank, so the time is mostly Python-side query building and compiling rather
+than database work. The same requests are run with the session's baked query
+support switched off and on, and the statement cache hit rate is reported for
+the baked run.
+'''
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flaskr import create_app
+from models import db, Category, Question
+from queries import statement_cache
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+
+
+def generate(total):
+    for name in CATEGORIES:
+        db.session.add(Category(name))
+    db.session.flush()
+    db.session.execute(Question.__table__.insert(), [
+        {'question': f'Question {i}', 'answer': f'Answer {i}', 'category': i % len(CATEGORIES) + 1, 'difficulty': i % 5 + 1}
+        for i in range(total)
+    ])
+    db.session.commit()
+
+
+def requests(total, seed):
+    rng = random.Random(seed)
+    pages = max(total // 10, 1)
+    return {
+        'questions_page': lambda client: client.get(f'/api/questions?page={rng.randint(1, pages)}'),
+        'questions_after': lambda client: client.get(f'/api/questions?after={rng.randint(0, total - 10)}'),
+        'category_questions': lambda client: client.get(f'/api/categories/{rng.randint(1, len(CATEGORIES))}/questions'),
+        'quiz_step': lambda client: client.post('/api/quizzes', json={
+            'previous_questions': [], 'quiz_category': {'id': rng.randint(1, len(CATEGORIES))}}),
+    }
+
+
+def run(app, request, count):
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(count):
+        with request(client) as response:
+            # Reading and closing the body finishes streamed responses and their request context.
+            response.get_data()
+            assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=600)
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint and mode')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='defaults to a throwaway sqlite file')
+    args = parser.parse_args()
+
+    app = create_app({'DATABASE_PATH': args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'trivia_bench.db')})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(args.questions)
+
+    print(f'{"endpoint":>20} {"plain ms":>10} {"baked ms":>10} {"hit rate":>10}')
+    for name, request in requests(args.questions, args.seed).items():
+        timings = {}
+        for baked in (False, True):
+            db.session.remove()
+            db.session.configure(enable_baked_queries=baked)
+            run(app, request, 20)
+            statement_cache.reset_stats()
+            timings[baked] = run(app, request, args.requests)
+        hit_rate = statement_cache.stats()['hit_rate']
+        print(f'{name:>20} {timings[False]:>10.3f} {timings[True]:>10.3f} {hit_rate if hit_rate is not None else 0:>10.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+'''
+Per-step latency of picking the next quiz question as a quiz goes on.
+
+Run from the backend directory:
+
+    python -m benchmarks.quizzes
+    python -m benchmarks.quizzes --questions 100000 --steps 500 --database-url postgresql://localhost:5432/trivia_bench
+
+One category is filled with --questions questions and a quiz of --steps steps
+is played through it, timing each step. "index" is the in-memory question
+index /api/quizzes uses; "order_by_random" is the old ORDER BY random() query
+with a NOT IN list of every previous question.
+'''
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy.sql.expression import func
+
+from models import setup_db, db, Category, Question
+from quiz import question_index
+
+CATEGORY = 1
+BATCH_SIZE = 10000
+
+
+def generate(total):
+    db.session.add(Category('Science'))
+    db.session.flush()
+    batch = []
+    for i in range(total):
+        batch.append({'question': f'Question {i}', 'answer': f'Answer {i}', 'category': CATEGORY, 'difficulty': i % 5 + 1})
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(Question.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Question.__table__.insert(), batch)
+    db.session.commit()
+
+
+def order_by_random(previous_questions):
+    return Question.query.filter_by(
+      category = CATEGORY
+      ).filter(
+        ~Question.id.in_(previous_questions)
+      ).order_by(func.random()).first()
+
+
+def play(pick, steps):
+    # Returns the milliseconds each step took.
+    previous_questions = []
+    timings = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        question = pick(previous_questions)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert question is not None and question.id not in previous_questions
+        previous_questions.append(question.id)
+        db.session.expunge_all()
+    return timings
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--skip-baseline', action='store_true', help='only time the question index')
+    parser.add_argument('--database-url', help='defaults to a throwaway sqlite file')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    setup_db(app, args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'trivia_bench.db'))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(args.questions)
+
+        strategies = [('index', lambda previous: question_index.random_question(CATEGORY, previous))]
+        if not args.skip_baseline:
+            strategies.append(('order_by_random', order_by_random))
+
+        # The first index step also loads the category's ids; that is reported on its own.
+        start = time.perf_counter()
+        question_index.ids(CATEGORY)
+        print(f'loaded {args.questions} ids in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        chunk = max(int(math.ceil(args.steps / 4.0)), 1)
+        print(f'{"strategy":>16} ' + ' '.join(f'{f"steps {i + 1}-{min(i + chunk, args.steps)}":>16}'
+                                              for i in range(0, args.steps, chunk)) + '   (median ms)')
+        for name, pick in strategies:
+            timings = play(pick, args.steps)
+            print(f'{name:>16} ' + ' '.join(f'{median(timings[i:i + chunk]):>16.3f}' for i in range(0, args.steps, chunk)))
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,55 @@
 import os
-from flask import Flask, request, abort, jsonify
+import itertools
+from flask import Flask, Response, request, abort, json, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql.expression import func
 from flask_cors import CORS
+from flask_migrate import Migrate
 import random
 
-from models import setup_db, Question, Category
+from models import setup_db, database_path, db, category_map, question_count, Question
+from search import count_matches, match_questions, SEARCH_RESULTS_LIMIT
+from quiz import question_index, quiz_sessions
+from ingest import ingest_questions, import_questions_command
+from json_provider import init_json
+from queries import question_by_id, questions_after, questions_in_category, questions_page
 
 QUESTIONS_PER_PAGE = 10
+# Rows fetched from the database cursor, and encoded per chunk, while streaming a response.
+STREAM_BATCH_SIZE = 500
+# Largest request body accepted, in bytes; bounds how long one bulk import can run. Override with MAX_CONTENT_LENGTH.
+MAX_CONTENT_LENGTH = 8 * 1024 * 1024
+
+def stream_questions(questions, **fields):
+  '''
+  JSON response with the given fields and a questions list, encoded a chunk of
+  questions at a time as they come off the cursor so memory stays flat however
+  many there are. total_questions is filled in at the end unless given.
+  '''
+  def generate():
+    yield '{"success": true, "questions": ['
+    total = 0
+    while True:
+      chunk = [question.format() for question in itertools.islice(questions, STREAM_BATCH_SIZE)]
+      if not chunk:
+        break
+      yield (',' if total else '') + json.dumps(chunk)[1:-1]
+      total += len(chunk)
+    fields.setdefault('total_questions', total)
+    yield '], ' + json.dumps(fields)[1:]
+
+  return Response(stream_with_context(generate()), mimetype='application/json')
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
+  app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+  if test_config is not None:
+    app.config.from_mapping(test_config)
+  init_json(app)
+  setup_db(app, app.config.get('DATABASE_PATH', database_path))
+  migrate = Migrate(app, db)
+  app.cli.add_command(import_questions_command)
   cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
 
   @app.after_request
@@ -23,40 +60,48 @@ def create_app(test_config=None):
 
   @app.route('/api/categories')
   def get_categories():
-    categories = Category.query.all()
-    formated_categorys = {}
-    for category in categories:
-        formated_categorys[category.id] = category.type
-    
+    formated_categorys, version = category_map()
+
     if formated_categorys:
-      return jsonify({
-        'success': True,
-        'categories': formated_categorys
-      })
+      # Clients that already hold this version get a 304 without a body.
+      if request.if_none_match.contains(version):
+        response = app.response_class(status=304)
+      else:
+        response = jsonify({
+          'success': True,
+          'categories': formated_categorys
+        })
+      response.set_etag(version)
+      return response
     abort(404)
 
   @app.route('/api/questions', methods=['GET','POST'])
   def questions():
     if request.method == 'GET':
       page = request.args.get('page', 1, type=int)
-      start = (page - 1) * QUESTIONS_PER_PAGE 
-      end = start + QUESTIONS_PER_PAGE
+      if page < 1:
+        abort(422)
+      # after=<id of the last question on the previous page> seeks straight to
+      # the next page instead of making the database skip over the earlier rows.
+      after = request.args.get('after', type=int)
 
-      questions = Question.query.all()
+      if after is not None:
+        questions = questions_after(after, QUESTIONS_PER_PAGE)
+      else:
+        questions = questions_page((page - 1) * QUESTIONS_PER_PAGE, QUESTIONS_PER_PAGE)
       formated_questions = [question.format() for question in questions]
+      total_questions = question_count()
 
-      categories = Category.query.all()
-      formated_categorys = {}
-      for category in categories:
-          formated_categorys[category.id] = category.type
+      formated_categorys, version = category_map()
 
-      if formated_questions and formated_categorys:
+      if total_questions and formated_categorys:
         return jsonify({
           'success': True,
-          'questions': formated_questions[start:end],
+          'questions': formated_questions,
           'categories': formated_categorys,
-          'total_questions': len(formated_questions),
-          'current_category': 1
+          'total_questions': total_questions,
+          'current_category': 1,
+          'next_cursor': questions[-1].id if len(questions) == QUESTIONS_PER_PAGE else None
         })
       #if we didn't return then there probably was an issue 
       abort(422)
@@ -70,14 +115,23 @@ def create_app(test_config=None):
           abort(422)
 
         search_term = question_json['searchTerm']
-        questions = Question.query.filter(Question.question.ilike(f'%{search_term}%')).all()
+        page = question_json.get('page', 1)
+        if not isinstance(page, int) or page < 1:
+          abort(422)
+        start = (page - 1) * QUESTIONS_PER_PAGE
 
-        return jsonify({
-          'success': True,
-          'questions': [question.format() for question in questions],
-          'totalQuestions': len(questions),
-          'currentCategory': 1
-        })
+        matches = match_questions(Question.query, Question, search_term)
+        # truncated: only the first SEARCH_RESULTS_LIMIT of the total_questions matches can be paged through.
+        total_questions, truncated = count_matches(db.session, matches)
+        questions = iter(())
+        if start < min(total_questions, SEARCH_RESULTS_LIMIT):
+          questions = iter(matches.offset(start).limit(min(QUESTIONS_PER_PAGE, SEARCH_RESULTS_LIMIT - start)).yield_per(STREAM_BATCH_SIZE))
+
+        return stream_questions(questions,
+                                totalQuestions=total_questions,
+                                total_questions=total_questions,
+                                truncated=truncated,
+                                currentCategory=1)
 
       if set(('question', 'answer', 'category', 'difficulty')) == question_json.keys():
         question = Question(question_json['question'],
@@ -95,9 +149,26 @@ def create_app(test_config=None):
       except Exception as e:
         abort(422)
 
+  @app.route('/api/questions/bulk', methods=['POST'])
+  def bulk_create_questions():
+    # request.stream isn't checked against MAX_CONTENT_LENGTH by Flask, so the limit is applied here.
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+      abort(413)
+    # One JSON question per line, read from the request stream as it arrives.
+    report = ingest_questions(request.stream)
+    if not report['inserted'] and not report['rejected']:
+      abort(422)
+
+    return jsonify({
+      'success': True,
+      'inserted': report['inserted'],
+      'rejected': report['rejected'],
+      'errors': report['errors']
+    })
+
   @app.route('/api/questions/<int:question_id>', methods=['DELETE'])
   def delete_question(question_id):
-    question = Question.query.filter_by(id = question_id).first()
+    question = question_by_id(question_id)
 
     if question:
       try:
@@ -112,16 +183,12 @@ def create_app(test_config=None):
     
   @app.route('/api/categories/<int:category_id>/questions', methods=['GET'])
   def get_question(category_id):
-      questions = Question.query.filter_by(category = category_id).all()
-      formated_questions = [question.format() for question in questions]
-      
-      if formated_questions:
-        return jsonify({
-          'success': True,
-          'questions': formated_questions,
-          'current_category': str(category_id),
-          'total_questions': len(formated_questions)
-        })
+      # yield_per reads through a server-side cursor instead of loading the whole category.
+      questions = iter(questions_in_category(category_id, STREAM_BATCH_SIZE))
+      first = next(questions, None)
+
+      if first is not None:
+        return stream_questions(itertools.chain([first], questions), current_category=str(category_id))
       abort(404)
 
   @app.route('/api/quizzes', methods=["POST"])
@@ -130,11 +197,7 @@ def create_app(test_config=None):
     previous_questions = quiz_json['previous_questions']
     category = quiz_json['quiz_category']['id']
 
-    question = Question.query.filter_by(
-      category = category
-      ).filter(
-        ~Question.id.in_(previous_questions)
-      ).order_by(func.random()).first()
+    question = question_index.random_question(category, previous_questions)
 
     if question:
       return jsonify({
@@ -143,6 +206,47 @@ def create_app(test_config=None):
       })
     abort(404)
   
+  @app.route('/api/quizzes/sessions', methods=['POST'])
+  def start_quiz():
+    quiz_json = request.get_json()
+    try:
+      category = quiz_json['quiz_category']['id']
+    except (KeyError, TypeError):
+      abort(422)
+
+    session_id, session = quiz_sessions.start(category)
+    if not session.size:
+      quiz_sessions.finish(session_id)
+      abort(404)
+    return jsonify({
+      'success': True,
+      'session_id': session_id,
+      'total_questions': session.size
+    })
+
+  @app.route('/api/quizzes/sessions/<session_id>/next', methods=['POST'])
+  def next_quiz_question(session_id):
+    session = quiz_sessions.get(session_id)
+    if session is None:
+      abort(404)
+
+    question = quiz_sessions.next_question(session)
+    return jsonify({
+      'success': True,
+      'question': question.format() if question else None,
+      'questions_asked': session.asked
+    })
+
+  @app.route('/api/quizzes/sessions/<session_id>', methods=['DELETE'])
+  def finish_quiz(session_id):
+    session = quiz_sessions.finish(session_id)
+    if session is None:
+      abort(404)
+    return jsonify({
+      'success': True,
+      'questions_asked': session.asked
+    })
+
   @app.errorhandler(404)
   def not_found(error):
     return jsonify({
@@ -151,6 +255,14 @@ def create_app(test_config=None):
       'message': 'Not Found'
     }), 404
 
+  @app.errorhandler(413)
+  def too_large(error):
+    return jsonify({
+      'success': False,
+      'error': 413,
+      'message': 'Request Entity Too Large'
+    }), 413
+
   @app.errorhandler(422)
   def unprocessable(error):
     return jsonify({
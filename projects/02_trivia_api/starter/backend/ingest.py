@@ -0,0 +1,139 @@
+import io
+import json
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from models import db, category_map, reset_question_count, Question
+from quiz import question_index
+
+'''
+Bulk question ingest.
+
+    flask import-questions questions.jsonl --batch-size 5000
+    curl -X POST --data-binary @questions.jsonl localhost:5000/api/questions/bulk
+
+Every line is a JSON object with the same four keys POST /api/questions takes.
+Valid rows are written a batch per transaction: COPY on Postgres, executemany
+everywhere else. Rejected rows are reported by line number and don't stop the
+rest of the file.
+'''
+
+QUESTION_KEYS = {'question', 'answer', 'category', 'difficulty'}
+# Row errors kept for the report; an import of a wrong file would otherwise list every line.
+MAX_REPORTED_ERRORS = 100
+
+
+def validate_question(line, categories):
+    # Returns (row, None) or (None, error message).
+    try:
+        question_json = json.loads(line)
+    except ValueError as e:
+        return None, f'invalid JSON: {e}'
+    if not isinstance(question_json, dict) or set(question_json) != QUESTION_KEYS:
+        return None, 'expected exactly the keys {}'.format(', '.join(sorted(QUESTION_KEYS)))
+
+    question = question_json['question']
+    answer = question_json['answer']
+    if not isinstance(question, str) or not question.strip() or not isinstance(answer, str) or not answer.strip():
+        return None, 'question and answer must be non-empty strings'
+    try:
+        category = int(question_json['category'])
+        difficulty = int(question_json['difficulty'])
+    except (TypeError, ValueError):
+        return None, 'category and difficulty must be integers'
+    if category not in categories:
+        return None, f'unknown category {category}'
+    return {'question': question, 'answer': answer, 'category': category, 'difficulty': difficulty}, None
+
+
+# COPY's text format ends fields at tabs and rows at newlines, so the free text columns escape them.
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_questions(connection, rows):
+    # Rows come from validate_question, so every value is present: two strings, then two integers.
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('{}\t{}\t{:d}\t{:d}\n'.format(row['question'].translate(COPY_ESCAPES),
+                                                   row['answer'].translate(COPY_ESCAPES),
+                                                   row['category'], row['difficulty']))
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert('COPY questions (question, answer, category, difficulty) FROM STDIN', buffer)
+
+
+def insert_questions(rows):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        copy_questions(connection, rows)
+    else:
+        connection.execute(Question.__table__.insert(), rows)
+
+
+'''
+ingest_questions(lines, batch_size)
+    validates and inserts questions from an iterable of JSONL lines, returning
+    {'inserted', 'rejected', 'errors'} where errors lists {'line', 'error'}.
+'''
+def ingest_questions(lines, batch_size=1000):
+    categories, version = category_map()
+    report = {'inserted': 0, 'rejected': 0, 'errors': []}
+
+    def reject(line_number, error):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_number, 'error': error})
+
+    def flush(batch):
+        try:
+            insert_questions([row for line_number, row in batch])
+            db.session.commit()
+            report['inserted'] += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            for line_number, row in batch:
+                reject(line_number, f'batch of lines {batch[0][0]}-{batch[-1][0]} failed: {e}')
+
+    batch = []
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        row, error = validate_question(line, categories)
+        if error:
+            reject(line_number, error)
+            continue
+        batch.append((line_number, row))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    # The rows bypassed Question.insert() and its mapper events.
+    if report['inserted']:
+        reset_question_count()
+        question_index.reset()
+    return report
+
+
+@click.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True, help='Rows written per transaction.')
+@with_appcontext
+def import_questions_command(path, batch_size):
+    """Bulk load trivia questions from a JSONL file."""
+    start = time.perf_counter()
+    with open(path, encoding='utf-8') as f:
+        report = ingest_questions(f, batch_size)
+    elapsed = time.perf_counter() - start
+
+    for error in report['errors']:
+        click.echo('line {line}: {error}'.format(**error), err=True)
+    if report['rejected'] > len(report['errors']):
+        click.echo('... and {} more rejected lines'.format(report['rejected'] - len(report['errors'])), err=True)
+    click.echo(f'Imported {report["inserted"]} questions in {elapsed:.2f}s '
+               f'({report["inserted"] / elapsed:.0f} rows/sec), {report["rejected"]} rejected.')
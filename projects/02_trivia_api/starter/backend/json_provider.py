@@ -0,0 +1,48 @@
+from flask.json import JSONEncoder
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+'''
+JSON encoding for jsonify and flask.json.dumps.
+
+Flask 1.x sends every jsonify call through app.json_encoder, so the provider
+is a JSONEncoder whose encode() hands the whole payload to orjson when it is
+installed. The stdlib encoder is kept for anything orjson can't encode, and
+dates still go through JSONEncoder.default so responses look the same either
+way.
+
+Set JSON_PROVIDER to 'orjson' or 'stdlib' in the app config to choose one;
+the default picks orjson when it is importable.
+'''
+
+class OrjsonEncoder(JSONEncoder):
+
+  def encode(self, o):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if self.sort_keys:
+      option |= orjson.OPT_SORT_KEYS
+    if self.indent:
+      option |= orjson.OPT_INDENT_2
+    try:
+      return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+    except TypeError:
+      # orjson.JSONEncodeError, e.g. integers past 64 bits.
+      return super(OrjsonEncoder, self).encode(o)
+
+
+ENCODERS = {'stdlib': JSONEncoder}
+if orjson is not None:
+  ENCODERS['orjson'] = OrjsonEncoder
+
+def init_json(app):
+  '''
+  registers the configured JSON encoder on app and returns its name.
+  '''
+  provider = app.config.get('JSON_PROVIDER', 'orjson' if orjson is not None else 'stdlib')
+  if provider not in ENCODERS:
+    raise ValueError(f'JSON_PROVIDER {provider!r} is not available, choose from {", ".join(sorted(ENCODERS))}')
+  app.json_encoder = ENCODERS[provider]
+  return provider
@@ -0,0 +1,93 @@
+"""questions.category as an indexed integer foreign key
+
+Revision ID: 3f8c1a6d2b57
+Revises:
+Create Date: 2026-10-18 19:04:12.583120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8c1a6d2b57'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Orphaned questions listed in the error when the upgrade refuses to run.
+MAX_LISTED_ORPHANS = 20
+
+question = sa.table('questions',
+    sa.column('id', sa.Integer),
+    sa.column('category', sa.String),
+    sa.column('category_id', sa.Integer),
+)
+category = sa.table('categories',
+    sa.column('id', sa.Integer),
+)
+
+
+def check_orphans(connection, condition):
+    # A question whose category isn't in categories would break the foreign key. Stop
+    # with the rows listed instead of guessing, so they can be fixed or deleted first.
+    orphans = connection.execute(
+        sa.select([question.c.id, question.c.category]).where(condition).order_by(question.c.id)
+    ).fetchall()
+    if orphans:
+        listed = ', '.join(f'{row[0]} (category {row[1]!r})' for row in orphans[:MAX_LISTED_ORPHANS])
+        more = f' and {len(orphans) - MAX_LISTED_ORPHANS} more' if len(orphans) > MAX_LISTED_ORPHANS else ''
+        raise RuntimeError(f'{len(orphans)} questions have a category that is not in categories: {listed}{more}. '
+                           'Point them at an existing category or clear their category, then upgrade again.')
+
+
+def upgrade():
+    # trivia.psql and databases made by db.create_all() are already partly or fully
+    # converted, so each step only runs if it is still needed.
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    columns = {column['name']: column for column in inspector.get_columns('questions')}
+    category_ids = [row[0] for row in connection.execute(sa.select([category.c.id]))]
+
+    if not isinstance(columns['category']['type'], sa.Integer):
+        category_text = sa.func.trim(question.c.category)
+        unknown = category_text.notin_([str(id) for id in category_ids]) if category_ids else sa.true()
+        check_orphans(connection, sa.and_(category_text != '', unknown))
+
+        op.add_column('questions', sa.Column('category_id', sa.Integer(), nullable=True))
+        # There are only a handful of categories, so one UPDATE per category converts
+        # the whole table without reading any rows into Python.
+        for category_id in category_ids:
+            connection.execute(question.update()
+                               .where(category_text == str(category_id))
+                               .values(category_id=category_id))
+        with op.batch_alter_table('questions') as batch_op:
+            batch_op.drop_column('category')
+            batch_op.alter_column('category_id', new_column_name='category')
+        inspector = sa.inspect(connection)
+    else:
+        check_orphans(connection, question.c.category.notin_(sa.select([category.c.id])))
+
+    foreign_keys = [foreign_key['constrained_columns'] for foreign_key in inspector.get_foreign_keys('questions')]
+    indexes = [index['name'] for index in inspector.get_indexes('questions')]
+    with op.batch_alter_table('questions') as batch_op:
+        if ['category'] not in foreign_keys:
+            batch_op.create_foreign_key('fk_questions_category', 'categories', ['category'], ['id'])
+        if 'ix_questions_category_id' not in indexes:
+            batch_op.create_index('ix_questions_category_id', ['category', 'id'], unique=False)
+
+
+def downgrade():
+    # The upgrade keeps an existing foreign key as it is, e.g. trivia.psql's, which is named category.
+    inspector = sa.inspect(op.get_bind())
+    foreign_keys = [foreign_key['name'] for foreign_key in inspector.get_foreign_keys('questions')
+                    if foreign_key['constrained_columns'] == ['category'] and foreign_key['name']]
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.drop_index('ix_questions_category_id')
+        for name in foreign_keys:
+            batch_op.drop_constraint(name, type_='foreignkey')
+        batch_op.alter_column('category', new_column_name='category_id')
+    op.add_column('questions', sa.Column('category', sa.String(), nullable=True))
+    op.execute(question.update().values(category=sa.cast(question.c.category_id, sa.String)))
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.drop_column('category_id')
@@ -1,13 +1,22 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+import time
+import hashlib
+from sqlalchemy import Column, ForeignKey, Index, String, Integer, create_engine, event, func
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+from search import create_search_index, register_search
+
 database_name = "trivia"
 database_path = "postgres://{}/{}".format('localhost:5432', database_name)
 
 db = SQLAlchemy()
 
+# Seconds a cached question count is trusted before it is read again, so
+# writes made by other processes show up without an explicit reset.
+QUESTION_COUNT_TTL = 30
+CATEGORY_CACHE_TTL = 300
+
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
@@ -18,6 +27,7 @@ def setup_db(app, database_path=database_path):
     db.app = app
     db.init_app(app)
     db.create_all()
+    create_search_index(db.engine, Question.__table__)
 
 '''
 Question
@@ -25,11 +35,13 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # Category listings and quiz index loads read (category, id) in order straight from this index.
+  __table_args__ = (Index('ix_questions_category_id', 'category', 'id'),)
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', name='fk_questions_category'))
   difficulty = Column(Integer)
 
   def __init__(self, question, answer, category, difficulty):
@@ -41,6 +53,7 @@ class Question(db.Model):
   def insert(self):
     db.session.add(self)
     db.session.commit()
+    reset_question_count()
   
   def update(self):
     db.session.commit()
@@ -48,6 +61,7 @@ class Question(db.Model):
   def delete(self):
     db.session.delete(self)
     db.session.commit()
+    reset_question_count()
 
   def format(self):
     return {
@@ -58,6 +72,24 @@ class Question(db.Model):
       'difficulty': self.difficulty
     }
 
+register_search(Question.__table__)
+
+'''
+question_count()
+    total number of questions, cached so paging through the list doesn't run
+    COUNT(*) on every request. Question.insert() and delete() reset it.
+'''
+_question_count = {'value': None, 'expires': 0}
+
+def question_count():
+    if _question_count['value'] is None or _question_count['expires'] <= time.monotonic():
+        _question_count['value'] = db.session.query(func.count(Question.id)).scalar()
+        _question_count['expires'] = time.monotonic() + QUESTION_COUNT_TTL
+    return _question_count['value']
+
+def reset_question_count():
+    _question_count['value'] = None
+
 '''
 Category
 
@@ -75,4 +107,29 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+category_map()
+    ({id: type} for every category, version stamp). Categories hardly ever
+    change so the map is kept in memory; the version is a hash of its contents,
+    so every process hands out the same one for the same categories and it can
+    be used as an ETag. Any insert, update or delete of a Category resets it.
+'''
+_category_cache = {'categories': None, 'version': None, 'expires': 0}
+
+def category_map():
+    if _category_cache['categories'] is None or _category_cache['expires'] <= time.monotonic():
+        categories = {category.id: category.type for category in Category.query.order_by(Category.id)}
+        digest = hashlib.sha1(json.dumps(sorted(categories.items())).encode()).hexdigest()
+        _category_cache['categories'] = categories
+        _category_cache['version'] = digest[:16]
+        _category_cache['expires'] = time.monotonic() + CATEGORY_CACHE_TTL
+    return _category_cache['categories'], _category_cache['version']
+
+def reset_category_map(*args):
+    _category_cache['categories'] = None
+
+event.listen(Category, 'after_insert', reset_category_map)
+event.listen(Category, 'after_update', reset_category_map)
+event.listen(Category, 'after_delete', reset_category_map)
@@ -0,0 +1,101 @@
+import threading
+
+from sqlalchemy import bindparam
+from sqlalchemy.ext import baked
+from sqlalchemy.util import LRUCache
+
+from models import db, Question
+
+'''
+Baked versions of the queries the API runs on every request.
+
+A baked query builds its Query and compiles its SQL once; later calls only
+bind new parameters. The compiled statements live in statement_cache, which
+counts its hits and misses so the saving can be checked with
+statement_cache.stats().
+'''
+
+# Baked queries and compiled statements kept, least recently used go first.
+STATEMENT_CACHE_SIZE = 200
+
+class StatementCache(LRUCache):
+
+  def __init__(self, capacity=STATEMENT_CACHE_SIZE):
+    super(StatementCache, self).__init__(capacity)
+    self.hits = 0
+    self.misses = 0
+    self.counter_lock = threading.Lock()
+
+  def get(self, key, default=None):
+    value = super(StatementCache, self).get(key, default)
+    with self.counter_lock:
+      if value is default:
+        self.misses += 1
+      else:
+        self.hits += 1
+    return value
+
+  def stats(self):
+    lookups = self.hits + self.misses
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_rate': self.hits / lookups if lookups else None,
+      'size': len(self)
+    }
+
+  def reset_stats(self):
+    with self.counter_lock:
+      self.hits = 0
+      self.misses = 0
+
+
+statement_cache = StatementCache()
+bakery = baked.Bakery(baked.BakedQuery, statement_cache)
+
+def session():
+  # Baked queries need the session itself rather than the scoped_session proxy.
+  return db.session()
+
+'''
+questions_page(start, per_page)
+    one page of questions in id order.
+'''
+def questions_page(start, per_page):
+  query = bakery(lambda session: session.query(Question))
+  query += lambda q: q.order_by(Question.id).offset(bindparam('start')).limit(bindparam('per_page'))
+  return query(session()).params(start=start, per_page=per_page).all()
+
+'''
+questions_after(after, per_page)
+    the page of questions following the question with id after.
+'''
+def questions_after(after, per_page):
+  query = bakery(lambda session: session.query(Question))
+  query += lambda q: q.filter(Question.id > bindparam('after')).order_by(Question.id).limit(bindparam('per_page'))
+  return query(session()).params(after=after, per_page=per_page).all()
+
+'''
+questions_in_category(category, batch_size)
+    every question in category in id order, fetched batch_size rows at a time.
+'''
+def questions_in_category(category, batch_size):
+  query = bakery(lambda session: session.query(Question))
+  query += lambda q: q.filter(Question.category == bindparam('category')).order_by(Question.id)
+  return query(session()).params(category=category).with_post_criteria(lambda q: q.yield_per(batch_size))
+
+'''
+question_ids_in_category(category)
+    the ids of every question in category, in order.
+'''
+def question_ids_in_category(category):
+  query = bakery(lambda session: session.query(Question.id))
+  query += lambda q: q.filter(Question.category == bindparam('category')).order_by(Question.id)
+  return [row[0] for row in query(session()).params(category=category)]
+
+'''
+question_by_id(question_id)
+    the question with that id, or None.
+'''
+def question_by_id(question_id):
+  return bakery(lambda session: session.query(Question))(session()).get(question_id)
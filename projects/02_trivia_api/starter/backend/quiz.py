@@ -0,0 +1,218 @@
+import random
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from models import Question
+from queries import question_by_id, question_ids_in_category
+
+# Seconds a category's id list is trusted before it is reloaded, so questions
+# added or removed by other processes show up in quizzes.
+QUESTION_INDEX_TTL = 300
+# Random probes made before falling back to scanning for the ids that are left.
+SAMPLE_ATTEMPTS = 8
+# Seconds a quiz session is kept after its last request.
+QUIZ_SESSION_TTL = 1800
+# Sessions held per process; the least recently used one is dropped past this.
+MAX_QUIZ_SESSIONS = 10000
+
+'''
+QuestionIndex
+    question ids per category, kept in memory so a quiz step can pick a random
+    unused question without sorting the category in the database. Ids are
+    stored in compact arrays, about 8 bytes per question.
+'''
+class QuestionIndex(object):
+
+  def __init__(self, ttl=QUESTION_INDEX_TTL):
+    self.ttl = ttl
+    self.categories = {}
+    self.lock = threading.Lock()
+
+  def ids(self, category):
+    category = str(category)
+    with self.lock:
+      entry = self.categories.get(category)
+      if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+
+    ids = array('q', question_ids_in_category(category))
+    with self.lock:
+      self.categories[category] = (ids, time.monotonic() + self.ttl)
+    return ids
+
+  def add(self, category, question_id):
+    with self.lock:
+      entry = self.categories.get(str(category))
+      if entry is not None:
+        entry[0].append(question_id)
+
+  def remove(self, category, question_id):
+    with self.lock:
+      entry = self.categories.get(str(category))
+      if entry is not None and question_id in entry[0]:
+        # Replaced rather than shrunk in place, a sample running in another
+        # thread may still be indexing the old array.
+        ids = array('q', entry[0])
+        ids.remove(question_id)
+        self.categories[str(category)] = (ids, entry[1])
+
+  def reset(self):
+    with self.lock:
+      self.categories.clear()
+
+  def sample(self, category, exclude):
+    '''
+    a random id in category that is not in exclude, or None once every
+    question has been used. Random probes cost the same however far into the
+    quiz we are until most of the category is used up; only then are the
+    remaining ids listed.
+    '''
+    ids = self.ids(category)
+    if len(exclude) < len(ids):
+      for _ in range(SAMPLE_ATTEMPTS):
+        question_id = ids[random.randrange(len(ids))]
+        if question_id not in exclude:
+          return question_id
+    remaining = [question_id for question_id in ids if question_id not in exclude]
+    return random.choice(remaining) if remaining else None
+
+  def random_question(self, category, previous_questions):
+    exclude = set(previous_questions)
+    while True:
+      question_id = self.sample(category, exclude)
+      if question_id is None:
+        return None
+      question = question_by_id(question_id)
+      if question is not None:
+        return question
+      # Deleted by another process since the ids were loaded.
+      self.remove(category, question_id)
+      exclude.add(question_id)
+
+
+question_index = QuestionIndex()
+
+def question_inserted(mapper, connection, question):
+  question_index.add(question.category, question.id)
+
+def question_deleted(mapper, connection, question):
+  question_index.remove(question.category, question.id)
+
+def question_updated(mapper, connection, question):
+  # The category may have changed; updates are rare enough to start over.
+  question_index.reset()
+
+event.listen(Question, 'after_insert', question_inserted)
+event.listen(Question, 'after_delete', question_deleted)
+event.listen(Question, 'after_update', question_updated)
+
+
+'''
+QuizSession
+    one quiz being played. The category's ids are shared with the question
+    index and the questions already asked are a bitset over their positions,
+    so a session costs one bit per question in its category.
+'''
+class QuizSession(object):
+
+  def __init__(self, category, ids):
+    self.category = category
+    self.ids = ids
+    # Questions added after the quiz started are left out of it.
+    self.size = len(ids)
+    self.used = bytearray((self.size + 7) // 8)
+    self.used_count = 0
+    self.asked = 0
+
+  def is_used(self, position):
+    return self.used[position >> 3] & (1 << (position & 7))
+
+  def mark_used(self, position):
+    self.used[position >> 3] |= 1 << (position & 7)
+    self.used_count += 1
+
+  def next_id(self):
+    '''
+    marks a random question not asked yet as used and returns its id, or None
+    once the category is used up.
+    '''
+    if self.used_count >= self.size:
+      return None
+    position = None
+    for _ in range(SAMPLE_ATTEMPTS):
+      probe = random.randrange(self.size)
+      if not self.is_used(probe):
+        position = probe
+        break
+    if position is None:
+      position = random.choice([probe for probe in range(self.size) if not self.is_used(probe)])
+    self.mark_used(position)
+    return self.ids[position]
+
+
+'''
+QuizSessionStore
+    quiz sessions of this process by session id, dropped QUIZ_SESSION_TTL
+    seconds after their last use.
+'''
+class QuizSessionStore(object):
+
+  def __init__(self, ttl=QUIZ_SESSION_TTL, max_sessions=MAX_QUIZ_SESSIONS):
+    self.ttl = ttl
+    self.max_sessions = max_sessions
+    self.sessions = OrderedDict()
+    self.lock = threading.Lock()
+
+  def purge(self, now):
+    # Sessions are kept in order of last use, so the expired ones are at the front.
+    while self.sessions:
+      session_id, (session, expires) = next(iter(self.sessions.items()))
+      if expires > now and len(self.sessions) <= self.max_sessions:
+        break
+      del self.sessions[session_id]
+
+  def start(self, category):
+    session = QuizSession(str(category), question_index.ids(category))
+    session_id = secrets.token_urlsafe(16)
+    with self.lock:
+      now = time.monotonic()
+      self.sessions[session_id] = (session, now + self.ttl)
+      self.purge(now)
+    return session_id, session
+
+  def get(self, session_id):
+    with self.lock:
+      now = time.monotonic()
+      self.purge(now)
+      entry = self.sessions.get(session_id)
+      if entry is None:
+        return None
+      self.sessions[session_id] = (entry[0], now + self.ttl)
+      self.sessions.move_to_end(session_id)
+      return entry[0]
+
+  def next_question(self, session):
+    while True:
+      with self.lock:
+        question_id = session.next_id()
+      if question_id is None:
+        return None
+      question = question_by_id(question_id)
+      if question is not None:
+        # Two requests for the same session can get here at once; += isn't atomic.
+        with self.lock:
+          session.asked += 1
+        return question
+
+  def finish(self, session_id):
+    with self.lock:
+      entry = self.sessions.pop(session_id, None)
+    return entry[0] if entry else None
+
+
+quiz_sessions = QuizSessionStore()
@@ -0,0 +1,96 @@
+import re
+
+from sqlalchemy import DDL, Float, Integer, event, func, literal_column, text
+
+'''
+Question search.
+
+Postgres matches the question and answer text against a GIN index on their
+tsvector and ranks with ts_rank. SQLite (used for local tests and benchmarks)
+mirrors both columns into an FTS5 table kept in sync by triggers and ranks
+with bm25. Every word of the search term matches as a prefix, so "autobio"
+still finds "autobiography".
+'''
+
+# Upper bound on the matches a search pages through, so a very common term
+# can't make every page rank the whole table. Only the count goes past it.
+SEARCH_RESULTS_LIMIT = 1000
+
+# Must stay identical to the indexed expression for Postgres to use the index.
+SEARCH_VECTOR = "to_tsvector('english', coalesce(question, '') || ' ' || coalesce(answer, ''))"
+FTS_TABLE = 'questions_fts'
+
+
+'''
+create_search_index(bind, table)
+    creates the search index for table if it doesn't exist yet. Safe to run on
+    every start, it also covers databases created before the index existed.
+'''
+def create_search_index(bind, table):
+    if bind.dialect.name == 'postgresql':
+        bind.execute(f'CREATE INDEX IF NOT EXISTS ix_{table.name}_search ON {table.name} USING gin ({SEARCH_VECTOR})')
+    elif bind.dialect.name == 'sqlite':
+        exists = bind.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                              name=FTS_TABLE).scalar()
+        if not exists:
+            bind.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(question, answer, content='{table.name}', content_rowid='id')")
+        # The triggers go whenever the table is rebuilt (SQLite migrations copy it), so they are checked every time.
+        bind.execute(f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table.name} BEGIN '
+                     f'INSERT INTO {FTS_TABLE}(rowid, question, answer) VALUES (new.id, new.question, new.answer); END')
+        bind.execute(f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table.name} BEGIN '
+                     f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer); END")
+        bind.execute(f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {table.name} BEGIN '
+                     f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer) VALUES ('delete', old.id, old.question, old.answer); "
+                     f'INSERT INTO {FTS_TABLE}(rowid, question, answer) VALUES (new.id, new.question, new.answer); END')
+        if not exists:
+            # Index the rows that were there before the table existed.
+            bind.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def register_search(table):
+    # Keeps the index in step with create_all/drop_all; the FTS table would otherwise outlive its content table.
+    event.listen(table, 'after_create', lambda target, connection, **kw: create_search_index(connection, target))
+    event.listen(table, 'before_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+
+def contains_pattern(search_term):
+    # Only terms without a single word to match on get here, e.g. "?" or "100%", so
+    # they are searched for literally: LIKE's wildcards and its escape are escaped.
+    return '%{}%'.format(re.sub(r'([\\%_])', r'\\\1', search_term))
+
+'''
+match_questions(query, model, search_term)
+    filters a query over model down to the questions matching search_term,
+    best matches first.
+'''
+def match_questions(query, model, search_term):
+    dialect = query.session.get_bind().dialect.name
+    words = re.findall(r'\w+', search_term)
+
+    if words and dialect == 'postgresql':
+        vector = literal_column(SEARCH_VECTOR)
+        tsquery = func.to_tsquery(literal_column("'english'"), ' & '.join(f'{word}:*' for word in words))
+        return query.filter(vector.op('@@')(tsquery)).order_by(func.ts_rank(vector, tsquery).desc(), model.id)
+
+    if words and dialect == 'sqlite':
+        phrase = ' '.join('"{}"*'.format(word) for word in words)
+        matches = text(f'SELECT rowid AS id, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :phrase')\
+            .columns(id=Integer, rank=Float)\
+            .bindparams(phrase=phrase)\
+            .alias('matches')
+        return query.join(matches, matches.c.id == model.id).order_by(matches.c.rank, model.id)
+
+    return query.filter(model.question.ilike(contains_pattern(search_term), escape='\\')).order_by(model.id)
+
+
+'''
+count_matches(session, matches)
+    the number of questions in matches, and whether that is more than the
+    SEARCH_RESULTS_LIMIT a search can page through. The full count only runs
+    when the capped one overflows.
+'''
+def count_matches(session, matches):
+    ids = matches.with_entities(literal_column('1')).order_by(None)
+    count = session.query(func.count()).select_from(ids.limit(SEARCH_RESULTS_LIMIT + 1).subquery()).scalar()
+    if count <= SEARCH_RESULTS_LIMIT:
+        return count, False
+    return session.query(func.count()).select_from(ids.subquery()).scalar(), True
@@ -1,10 +1,14 @@
 import os
 import unittest
 import json
+from unittest import mock
 from flask_sqlalchemy import SQLAlchemy
 
 from flaskr import create_app
-from models import setup_db, Question, Category
+from json_provider import init_json
+from models import setup_db, db, Question, Category
+from queries import statement_cache
+from search import count_matches, match_questions
 
 
 class TriviaTestCase(unittest.TestCase):
@@ -48,6 +52,27 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertNotEqual(len(data['categories']), 0)
 
+    def test_categories_not_modified_for_matching_etag(self):
+        res = self.client().get('/api/categories')
+        etag = res.headers['ETag']
+        res = self.client().get('/api/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.headers['ETag'], etag)
+        self.assertEqual(res.data, b'')
+
+    def test_json_providers_return_the_same_document(self):
+        documents = []
+        for provider in ('stdlib', 'orjson'):
+            self.app.config['JSON_PROVIDER'] = provider
+            try:
+                init_json(self.app)
+            except ValueError:
+                self.skipTest('orjson is not installed')
+            documents.append(json.loads(self.client().get('/api/questions?page=1').data))
+
+        self.assertEqual(documents[0], documents[1])
+
     def test_try_to_delete_an_invalid_question(self):
         res = self.client().delete('/api/questions/1')
         data = json.loads(res.data)
@@ -55,6 +80,13 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 404)
         self.assertEqual(data['success'], False)
 
+    def test_category_questions_only_come_from_that_category(self):
+        res = self.client().get('/api/categories/1/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({question['category'] for question in data['questions']}, {1})
+
     def test_create_new_question(self):
         res = self.client().post('/api/questions', json = self.new_question)
         data = json.loads(res.data)
@@ -62,6 +94,86 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertEqual(data['success'], True)
 
+    def test_quiz_skips_previous_questions(self):
+        res = self.client().get('/api/categories/1/questions')
+        ids = [question['id'] for question in json.loads(res.data)['questions']]
+        quiz = {'previous_questions': ids[1:], 'quiz_category': {'type': 'Science', 'id': '1'}}
+        res = self.client().post('/api/quizzes', json=quiz)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['question']['id'], ids[0])
+
+    def test_quiz_ends_when_category_is_used_up(self):
+        res = self.client().get('/api/categories/1/questions')
+        ids = [question['id'] for question in json.loads(res.data)['questions']]
+        quiz = {'previous_questions': ids, 'quiz_category': {'type': 'Science', 'id': 1}}
+        res = self.client().post('/api/quizzes', json=quiz)
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_quiz_session_asks_each_question_once(self):
+        res = self.client().post('/api/quizzes/sessions', json={'quiz_category': {'type': 'Science', 'id': 1}})
+        session = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+
+        asked = []
+        for _ in range(session['total_questions']):
+            res = self.client().post('/api/quizzes/sessions/{}/next'.format(session['session_id']))
+            asked.append(json.loads(res.data)['question']['id'])
+        res = self.client().post('/api/quizzes/sessions/{}/next'.format(session['session_id']))
+        self.assertIsNone(json.loads(res.data)['question'])
+        self.assertEqual(len(set(asked)), session['total_questions'])
+
+        res = self.client().delete('/api/quizzes/sessions/{}'.format(session['session_id']))
+        self.assertEqual(json.loads(res.data)['questions_asked'], session['total_questions'])
+
+    def test_finished_quiz_session_is_gone(self):
+        res = self.client().post('/api/quizzes/sessions', json={'quiz_category': {'type': 'Science', 'id': 1}})
+        session_id = json.loads(res.data)['session_id']
+        self.client().delete('/api/quizzes/sessions/{}'.format(session_id))
+        res = self.client().post('/api/quizzes/sessions/{}/next'.format(session_id))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+
+    def test_bulk_create_reports_rejected_lines(self):
+        lines = [
+            json.dumps(self.new_question),
+            json.dumps({'question': 'Missing answer', 'category': 1, 'difficulty': 1}),
+            'not json',
+            json.dumps(dict(self.new_question, category=999)),
+        ]
+        res = self.client().post('/api/questions/bulk', data='\n'.join(lines), content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['inserted'], 1)
+        self.assertEqual(data['rejected'], 3)
+        self.assertEqual([error['line'] for error in data['errors']], [2, 3, 4])
+
+    def test_bulk_create_rejects_bodies_over_the_size_limit(self):
+        self.app.config['MAX_CONTENT_LENGTH'] = 100
+        question = dict(self.new_question, question='Too large to import')
+        body = '\n'.join([json.dumps(question)] * 5)
+        res = self.client().post('/api/questions/bulk', data=body, content_type='application/x-ndjson')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 413)
+        self.assertEqual(data['success'], False)
+        with self.app.app_context():
+            self.assertEqual(Question.query.filter_by(question=question['question']).count(), 0)
+
+    def test_repeated_pages_reuse_baked_statements(self):
+        self.client().get('/api/questions?page=1')
+        statement_cache.reset_stats()
+        self.client().get('/api/questions?page=2')
+        stats = statement_cache.stats()
+
+        self.assertGreater(stats['hits'], 0)
+        self.assertEqual(stats['misses'], 0)
+
     def test_search_question(self):
         res = self.client().post('/api/questions', json = self.search_question)
         data = json.loads(res.data)
@@ -70,6 +182,38 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertGreaterEqual(len(data['questions']), 1)
 
+    def test_search_matches_word_prefixes_in_question_and_answer(self):
+        res = self.client().post('/api/questions', json={'searchTerm': 'autobio'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('Maya Angelou', [question['answer'] for question in data['questions']])
+
+        res = self.client().post('/api/questions', json={'searchTerm': 'Maya'})
+        data = json.loads(res.data)
+        self.assertIn('Maya Angelou', [question['answer'] for question in data['questions']])
+
+    def test_search_pages_past_the_last_match_are_empty(self):
+        res = self.client().post('/api/questions', json={'searchTerm': 'autobio', 'page': 100})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['questions'], [])
+        self.assertGreaterEqual(data['total_questions'], 1)
+        self.assertEqual(data['truncated'], False)
+
+    def test_search_count_is_not_capped_by_results_limit(self):
+        with self.app.app_context():
+            for answer in ('Dodo', 'Moa'):
+                Question('Which extinct bird was flightless?', answer, 1, 1).insert()
+            matches = match_questions(Question.query, Question, 'flightless')
+            total = matches.count()
+            self.assertGreater(total, 1)
+
+            self.assertEqual(count_matches(db.session, matches), (total, False))
+            with mock.patch('search.SEARCH_RESULTS_LIMIT', 1):
+                self.assertEqual(count_matches(db.session, matches), (total, True))
+
     def try_to_delete_a_valid_question(self):
         res = self.client().delete('/api/questions/5')
         data = json.loads(res.data)
@@ -90,6 +234,33 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(len(page2['questions']))
         self.assertNotEqual(page1, page2)
 
+    def test_questions_page_is_limited_and_counts_every_question(self):
+        res = self.client().get('/api/questions?page=1')
+        data = json.loads(res.data)
+
+        with self.app.app_context():
+            total = Question.query.count()
+        self.assertEqual(res.status_code, 200)
+        self.assertLessEqual(len(data['questions']), 10)
+        self.assertEqual(data['total_questions'], total)
+
+    def test_questions_after_cursor_matches_next_page(self):
+        page1 = json.loads(self.client().get('/api/questions?page=1').data)
+        page2 = json.loads(self.client().get('/api/questions?page=2').data)
+        res = self.client().get('/api/questions?after={}'.format(page1['next_cursor']))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['questions'], page2['questions'])
+
+    def test_questions_page_below_one_is_rejected(self):
+        for page in (0, -1):
+            res = self.client().get('/api/questions?page={}'.format(page))
+            data = json.loads(res.data)
+
+            self.assertEqual(res.status_code, 422)
+            self.assertEqual(data['success'], False)
+
     """
     TODO
     Write at least one test for each test for successful operation and for expected errors.
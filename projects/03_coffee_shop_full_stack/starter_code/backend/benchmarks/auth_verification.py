@@ -0,0 +1,112 @@
+'''
+Token verifications per second through the coffee shop's requires_auth, with and without the verified token cache.
+
+Run from the backend directory:
+
+    python -m benchmarks.auth_verification
+    python -m benchmarks.auth_verification --tokens 1000 --seconds 5
+
+An RSA key is generated locally and published as a JWKS file, so no Auth0
+tenant or network is needed. --tokens distinct tokens are signed with it and
+requests cycle through them. "uncached" verifies the signature on every call;
+"cached" is the normal path, where only the first call per token does. The
+per-stage timings collected by auth.timings are printed for both.
+'''
+import argparse
+import base64
+import json
+import os
+import tempfile
+import time
+
+from Crypto.PublicKey import RSA
+from flask import Flask
+from jose import jwt
+
+from fsnd_auth import JWKSKeyStore, VerifiedTokenCache
+from src.auth.auth import auth
+
+KID = 'benchmark'
+PERMISSIONS = ['get:drinks-detail', 'post:drinks', 'patch:drinks', 'delete:drinks']
+
+
+def b64(number):
+    return base64.urlsafe_b64encode(number.to_bytes((number.bit_length() + 7) // 8, 'big')).rstrip(b'=').decode()
+
+
+def generate_key(bits, directory):
+    # Returns the private key as PEM and a file:// url of a JWKS holding its public half.
+    key = RSA.generate(bits)
+    path = os.path.join(directory, 'jwks.json')
+    with open(path, 'w') as f:
+        json.dump({'keys': [{'kty': 'RSA', 'kid': KID, 'use': 'sig', 'alg': 'RS256',
+                             'n': b64(key.n), 'e': b64(key.e)}]}, f)
+    return key.exportKey('PEM').decode(), 'file://' + path
+
+
+def sign(private_key, count):
+    now = int(time.time())
+    return [jwt.encode({
+        'iss': auth.issuer,
+        'aud': auth.audience,
+        'sub': f'user|{i}',
+        'iat': now,
+        'exp': now + 3600,
+        'permissions': PERMISSIONS
+    }, private_key, algorithm='RS256', headers={'kid': KID}) for i in range(count)]
+
+
+def throughput(app, view, tokens, seconds):
+    # Returns verifications per second through requires_auth.
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for token in tokens:
+            with app.test_request_context(headers={'Authorization': 'Bearer ' + token}):
+                view()
+        calls += len(tokens)
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=100, help='distinct tokens requests cycle through')
+    parser.add_argument('--seconds', type=float, default=2.0, help='time spent on each mode')
+    parser.add_argument('--bits', type=int, default=2048)
+    args = parser.parse_args()
+
+    private_key, jwks_url = generate_key(args.bits, tempfile.mkdtemp())
+    auth.key_provider = JWKSKeyStore(jwks_url, background=False)
+    tokens = sign(private_key, args.tokens)
+
+    app = Flask(__name__)
+    view = auth.requires_auth('get:drinks-detail', 'post:drinks')(lambda payload: payload)
+
+    results = {}
+    stages = {}
+    # max_entries=0 drops every payload as soon as it is stored.
+    for mode, cache in (('uncached', VerifiedTokenCache(max_entries=0)), ('cached', VerifiedTokenCache())):
+        auth.verified_tokens = cache
+        throughput(app, view, tokens[:1], 0.1)
+        auth.timings.reset()
+        results[mode] = throughput(app, view, tokens, args.seconds)
+        stages[mode] = auth.timings.snapshot()
+
+    print(f'{"mode":>10} {"verifies/s":>12}')
+    for mode, rate in results.items():
+        print(f'{mode:>10} {rate:>12,.0f}')
+    print(f'{"speedup":>10} {results["cached"] / results["uncached"]:>11.1f}x')
+
+    print()
+    print(f'{"mode":>10} {"stage":>12} {"count":>10} {"mean µs":>10}')
+    for mode, snapshot in stages.items():
+        for stage in ('header', 'cache', 'jwks', 'verify', 'permissions'):
+            histogram = snapshot.get(stage)
+            if histogram and histogram['count']:
+                mean = histogram['sum'] / histogram['count'] * 1e6
+                print(f'{mode:>10} {stage:>12} {histogram["count"]:>10,} {mean:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,11 @@ import json
 from flask_cors import CORS
 
 from .database.models import db_drop_and_create_all, setup_db, Drink
-from .auth.auth import AuthError, requires_auth
+from .auth.auth import AuthError, requires_auth, timings
+from .json_provider import init_json
 
 app = Flask(__name__)
+init_json(app)
 setup_db(app)
 CORS(app)
 
@@ -75,6 +77,20 @@ CORS(app)
 '''
 
 
+'''
+GET /metrics
+    per-stage latency histograms of the auth layer (header parsing, token
+    cache, JWKS lookup, signature verification, permission checks) in the
+    Prometheus text format
+    only served when the ENABLE_METRICS environment variable is set, so the
+    timings aren't public by default
+'''
+if os.environ.get('ENABLE_METRICS', '').lower() in ('1', 'true', 'yes'):
+    @app.route('/metrics')
+    def metrics():
+        return timings.prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
+
 ## Error Handling
 '''
 Example error handling for unprocessable entity
@@ -105,6 +121,14 @@ def unprocessable(error):
 
 
 '''
-@TODO implement error handler for AuthError
-    error handler should conform to general task above 
+error handler for AuthError
+    conforms to the general task above, using the status code and
+    description the auth layer raised with
 '''
+@app.errorhandler(AuthError)
+def auth_error(error):
+    return jsonify({
+                    "success": False,
+                    "error": error.status_code,
+                    "message": error.error['description']
+                    }), error.status_code
@@ -1,86 +1,54 @@
-import json
-from flask import request, _request_ctx_stack
-from functools import wraps
-from jose import jwt
-from urllib.request import urlopen
+import os
+
+from fsnd_auth import Auth, AuthError
 
 
 AUTH0_DOMAIN = 'udacity-fsnd.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'dev'
+# Point JWKS_URL at a file:// URL or a local stub server to test without Auth0.
+JWKS_URL = os.environ.get('JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
 
 ## AuthError Exception
 '''
 AuthError Exception
-A standardized way to communicate auth failure modes
+A standardized way to communicate auth failure modes, shared with the other
+apps through fsnd_auth
 '''
-class AuthError(Exception):
-    def __init__(self, error, status_code):
-        self.error = error
-        self.status_code = status_code
 
 
-## Auth Header
+## Auth
 
 '''
-@TODO implement get_token_auth_header() method
-    it should attempt to get the header from the request
-        it should raise an AuthError if no header is present
-    it should attempt to split bearer and the token
-        it should raise an AuthError if the header is malformed
-    return the token part of the header
-'''
-def get_token_auth_header():
-   raise Exception('Not Implemented')
+auth
+    verifies Auth0 tokens for this API against the tenant's cached JWKS keys.
+    The functions below are its methods; see SharedAuth/fsnd_auth/auth.py.
 
-'''
-@TODO implement check_permissions(permission, payload) method
-    @INPUTS
-        permission: string permission (i.e. 'post:drink')
-        payload: decoded jwt payload
+get_token_auth_header()
+    gets the bearer token from the Authorization header of the request
+    raises an AuthError if the header is missing or malformed
 
-    it should raise an AuthError if permissions are not included in the payload
+check_permissions(permission, payload, require='all')
+    raises an AuthError if the payload has no permissions claim
         !!NOTE check your RBAC settings in Auth0
-    it should raise an AuthError if the requested permission string is not in the payload permissions array
-    return true otherwise
-'''
-def check_permissions(permission, payload):
-    raise Exception('Not Implemented')
-
-'''
-@TODO implement verify_decode_jwt(token) method
-    @INPUTS
-        token: a json web token (string)
-
-    it should be an Auth0 token with key id (kid)
-    it should verify the token using Auth0 /.well-known/jwks.json
-    it should decode the payload from the token
-    it should validate the claims
-    return the decoded payload
-
-    !!NOTE urlopen has a common certificate error described here: https://stackoverflow.com/questions/50236117/scraping-ssl-certificate-verify-failed-error-for-http-en-wikipedia-org
-'''
-def verify_decode_jwt(token):
-    raise Exception('Not Implemented')
-
-'''
-@TODO implement @requires_auth(permission) decorator method
-    @INPUTS
-        permission: string permission (i.e. 'post:drink')
-
-    it should use the get_token_auth_header method to get the token
-    it should use the verify_decode_jwt method to decode the jwt
-    it should use the check_permissions method validate claims and check the requested permission
-    return the decorator which passes the decoded payload to the decorated method
-'''
-def requires_auth(permission=''):
-    def requires_auth_decorator(f):
-        @wraps(f)
-        def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            return f(payload, *args, **kwargs)
-
-        return wrapper
-    return requires_auth_decorator
\ No newline at end of file
+    raises an AuthError if the requested permissions are not in the payload permissions array
+    returns true otherwise
+
+verify_decode_jwt(token)
+    verifies the token against the cached keys, validates its claims and
+    returns the decoded payload; tokens verified before are answered from
+    the shared verified token cache until they expire
+
+@requires_auth(*permissions, require='all') decorator method
+    permissions: string permissions (i.e. 'post:drink'), none to only require a valid token
+    require: 'all' if every permission is needed, 'any' if one of them is enough
+    passes the decoded payload to the decorated method
+'''
+auth = Auth.auth0(AUTH0_DOMAIN, API_AUDIENCE, jwks_url=JWKS_URL, algorithms=ALGORITHMS)
+# Per-stage latency of requires_auth; timings.snapshot() or timings.prometheus() to read it.
+timings = auth.timings
+
+get_token_auth_header = auth.get_token_auth_header
+check_permissions = auth.check_permissions
+verify_decode_jwt = auth.verify_decode_jwt
+requires_auth = auth.requires_auth
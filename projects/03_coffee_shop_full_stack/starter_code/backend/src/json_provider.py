@@ -0,0 +1,50 @@
+import os
+
+from flask.json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+'''
+orjson encoding for the coffee shop's responses.
+
+Every route answers through jsonify, which Flask 1.x sends through
+app.json_encoder. Drinks are only ids, titles and recipes (lists of
+color/name/parts dicts) and errors are flat dicts, all of which orjson
+encodes natively, so DrinkEncoder hands the payload straight to it and
+only falls back to Flask's encoder when orjson refuses something.
+
+The app is created when api.py is imported, before any config could be
+set, so the encoder is chosen with the JSON_PROVIDER environment variable
+('orjson' or 'stdlib'). Without it, orjson is used when it is installed.
+'''
+
+
+class DrinkEncoder(JSONEncoder):
+
+    def encode(self, o):
+        # jsonify sorts keys by default (JSON_SORT_KEYS) and only indents in debug mode.
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super().encode(o)
+
+
+def init_json(app):
+    '''
+    init_json(app)
+        sets app.json_encoder from JSON_PROVIDER and returns the provider's name
+    '''
+    provider = os.environ.get('JSON_PROVIDER', 'orjson' if orjson is not None else 'stdlib')
+    if provider == 'stdlib':
+        app.json_encoder = JSONEncoder
+    elif provider == 'orjson' and orjson is not None:
+        app.json_encoder = DrinkEncoder
+    else:
+        raise ValueError(f"JSON_PROVIDER must be 'orjson' (if installed) or 'stdlib', not {provider!r}")
+    return provider